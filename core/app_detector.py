@@ -1,7 +1,8 @@
 """
-Foreground application detector — polls the active window and fires
-a callback when the foreground app changes.
-Uses Win32 GetForegroundWindow + GetWindowThreadProcessId + OpenProcess.
+Foreground application detector — listens for foreground-window changes
+and fires a callback when the foreground app changes.
+Uses a Win32 WinEvent hook (EVENT_SYSTEM_FOREGROUND), falling back to
+polling GetForegroundWindow if the hook cannot be installed.
 Resolves UWP apps hosted inside ApplicationFrameHost.exe by inspecting
 the CoreWindow child to find the real packaged process.
 """
@@ -9,8 +10,10 @@ the CoreWindow child to find the real packaged process.
 import ctypes
 import ctypes.wintypes as wt
 import os
+import sys
 import threading
 import time
+from collections import OrderedDict
 
 user32 = ctypes.windll.user32
 kernel32 = ctypes.windll.kernel32
@@ -20,6 +23,33 @@ psapi = ctypes.windll.psapi
 PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
 MAX_PATH = 260
 GW_CHILD = 5  # for GetWindow()
+EVENT_SYSTEM_FOREGROUND = 0x0003
+WINEVENT_OUTOFCONTEXT = 0x0000
+WM_QUIT = 0x0012
+WM_TIMER = 0x0113
+PM_NOREMOVE = 0x0000
+
+# A UWP CoreWindow can attach to its frame a moment after the foreground
+# event fires, and no second event follows.  Re-check a few times before
+# settling on ApplicationFrameHost.exe.
+_UWP_RECHECK_MS = 150
+_UWP_RECHECK_TRIES = 4
+
+# (hwnd, pid) -> resolved .exe name.  A window handle belongs to a single
+# process for its whole lifetime, so pairing it with the PID guards against
+# handle reuse without having to open the process again.
+_EXE_CACHE: OrderedDict = OrderedDict()
+_EXE_CACHE_MAX = 256
+
+# Reusable out-parameter for GetWindowThreadProcessId.  Lookups only ever
+# run on the AppDetector thread, so one shared buffer is enough.
+_PID_BUF = wt.DWORD()
+_PID_REF = ctypes.byref(_PID_BUF)
+
+# Reusable image-path buffer + size for QueryFullProcessImageNameW (same thread)
+_EXE_BUF = ctypes.create_unicode_buffer(MAX_PATH)
+_EXE_SIZE = wt.DWORD(MAX_PATH)
+_EXE_SIZE_REF = ctypes.byref(_EXE_SIZE)
 
 # --- Win32 prototypes -------------------------------------------------------
 user32.GetForegroundWindow.restype = wt.HWND
@@ -41,14 +71,33 @@ kernel32.QueryFullProcessImageNameW.restype = wt.BOOL
 # For resolving UWP child windows
 user32.FindWindowExW.argtypes = [wt.HWND, wt.HWND, wt.LPCWSTR, wt.LPCWSTR]
 user32.FindWindowExW.restype = wt.HWND
+_UWP_CORE_WINDOW = "Windows.UI.Core.CoreWindow"
+_UWP_FRAME_HOST = "applicationframehost.exe"
 
-user32.GetClassNameW.argtypes = [wt.HWND, ctypes.c_wchar_p, ctypes.c_int]
-user32.GetClassNameW.restype = ctypes.c_int
+# WinEvent hook — fires on the hooking thread while it pumps messages
+WINEVENTPROC = ctypes.WINFUNCTYPE(
+    None, wt.HANDLE, wt.DWORD, wt.HWND, wt.LONG, wt.LONG, wt.DWORD, wt.DWORD,
+)
+user32.SetWinEventHook.argtypes = [
+    wt.DWORD, wt.DWORD, wt.HMODULE, WINEVENTPROC, wt.DWORD, wt.DWORD, wt.DWORD,
+]
+user32.SetWinEventHook.restype = wt.HANDLE
+user32.UnhookWinEvent.argtypes = [wt.HANDLE]
+user32.UnhookWinEvent.restype = wt.BOOL
 
-# EnumChildWindows callback type
-WNDENUMPROC = ctypes.WINFUNCTYPE(wt.BOOL, wt.HWND, wt.LPARAM)
-user32.EnumChildWindows.argtypes = [wt.HWND, WNDENUMPROC, wt.LPARAM]
-user32.EnumChildWindows.restype = wt.BOOL
+user32.GetMessageW.argtypes = [ctypes.POINTER(wt.MSG), wt.HWND, wt.UINT, wt.UINT]
+user32.GetMessageW.restype = wt.BOOL
+user32.PeekMessageW.argtypes = [
+    ctypes.POINTER(wt.MSG), wt.HWND, wt.UINT, wt.UINT, wt.UINT,
+]
+user32.PeekMessageW.restype = wt.BOOL
+user32.PostThreadMessageW.argtypes = [wt.DWORD, wt.UINT, wt.WPARAM, wt.LPARAM]
+user32.PostThreadMessageW.restype = wt.BOOL
+user32.SetTimer.argtypes = [wt.HWND, ctypes.c_size_t, wt.UINT, ctypes.c_void_p]
+user32.SetTimer.restype = ctypes.c_size_t
+user32.KillTimer.argtypes = [wt.HWND, ctypes.c_size_t]
+user32.KillTimer.restype = wt.BOOL
+kernel32.GetCurrentThreadId.restype = wt.DWORD
 
 
 def _exe_from_pid(pid: int) -> str | None:
@@ -57,103 +106,203 @@ def _exe_from_pid(pid: int) -> str | None:
     if not hproc:
         return None
     try:
-        buf = ctypes.create_unicode_buffer(MAX_PATH)
-        size = wt.DWORD(MAX_PATH)
-        if kernel32.QueryFullProcessImageNameW(hproc, 0, buf, ctypes.byref(size)):
-            return os.path.basename(buf.value)
+        _EXE_SIZE.value = MAX_PATH
+        if kernel32.QueryFullProcessImageNameW(hproc, 0, _EXE_BUF, _EXE_SIZE_REF):
+            # Interned so repeat comparisons against the last exe are cheap
+            return sys.intern(os.path.basename(_EXE_BUF.value))
     finally:
         kernel32.CloseHandle(hproc)
     return None
 
 
-def _resolve_uwp_child(hwnd) -> str | None:
+def _resolve_uwp_child(hwnd, host_pid: int) -> str | None:
     """
     ApplicationFrameHost.exe hosts UWP apps.  The actual app lives in a
-    child window whose class is 'Windows.UI.Core.CoreWindow'.  Find that
-    child and return the .exe of its owning process.
+    direct child window whose class is 'Windows.UI.Core.CoreWindow'.  Find
+    that child and return the .exe of its owning process.
     """
-    host_pid = wt.DWORD()
-    user32.GetWindowThreadProcessId(hwnd, ctypes.byref(host_pid))
-
-    result = [None]
-
-    def _enum_cb(child_hwnd, _lparam):
-        # Check class name of each child
-        cls = ctypes.create_unicode_buffer(256)
-        user32.GetClassNameW(child_hwnd, cls, 256)
-        if cls.value == "Windows.UI.Core.CoreWindow":
-            child_pid = wt.DWORD()
-            user32.GetWindowThreadProcessId(child_hwnd, ctypes.byref(child_pid))
-            # Only useful if the child is a different process than the host
-            if child_pid.value != host_pid.value:
-                exe = _exe_from_pid(child_pid.value)
-                if exe:
-                    result[0] = exe
-                    return False  # stop enumeration
-        return True  # continue
-
-    user32.EnumChildWindows(hwnd, WNDENUMPROC(_enum_cb), 0)
-    return result[0]
-
-
-def get_foreground_exe() -> str | None:
+    child = user32.FindWindowExW(hwnd, None, _UWP_CORE_WINDOW, None)
+    while child:
+        user32.GetWindowThreadProcessId(child, _PID_REF)
+        child_pid = _PID_BUF.value
+        # Only useful if the child is a different process than the host
+        if child_pid != host_pid:
+            exe = _exe_from_pid(child_pid)
+            if exe:
+                return exe
+        child = user32.FindWindowExW(hwnd, child, _UWP_CORE_WINDOW, None)
+    return None
+
+
+def get_foreground_exe(hwnd=None) -> str | None:
     """Return the .exe filename of the current foreground window, or None.
+    If *hwnd* is given (e.g. from a WinEvent), it is used instead of
+    querying GetForegroundWindow.
     Resolves UWP apps hosted in ApplicationFrameHost.exe."""
-    hwnd = user32.GetForegroundWindow()
+    if hwnd is None:
+        hwnd = user32.GetForegroundWindow()
     if not hwnd:
         return None
 
-    pid = wt.DWORD()
-    user32.GetWindowThreadProcessId(hwnd, ctypes.byref(pid))
-    if pid.value == 0:
+    user32.GetWindowThreadProcessId(hwnd, _PID_REF)
+    pid = _PID_BUF.value
+    if pid == 0:
         return None
 
-    exe = _exe_from_pid(pid.value)
+    key = (hwnd, pid)
+    exe = _EXE_CACHE.get(key)
+    if exe is not None:
+        _EXE_CACHE.move_to_end(key)
+        return exe
+
+    exe = _exe_from_pid(pid)
     if not exe:
         return None
 
     # UWP apps appear as ApplicationFrameHost.exe — resolve the real app
-    if exe.lower() == "applicationframehost.exe":
-        real = _resolve_uwp_child(hwnd)
-        if real:
-            return real
+    if exe.lower() == _UWP_FRAME_HOST:
+        real = _resolve_uwp_child(hwnd, pid)
+        if not real:
+            # CoreWindow may not be attached yet — don't cache the host
+            return exe
+        exe = real
 
+    _EXE_CACHE[key] = exe
+    if len(_EXE_CACHE) > _EXE_CACHE_MAX:
+        _EXE_CACHE.popitem(last=False)
     return exe
 
 
 class AppDetector:
     """
-    Polls the foreground window every *interval* seconds.
-    Calls ``on_change(exe_name: str)`` when the foreground app changes.
+    Watches the foreground window via a WinEvent hook and calls
+    ``on_change(exe_name: str)`` when the foreground app changes.
+    If the hook cannot be installed, polls every *interval* seconds instead.
     """
 
+    __slots__ = ("_on_change", "_interval", "_last_exe", "_stop", "_thread",
+                 "_thread_id", "_win_event_proc", "_recheck_timer",
+                 "_recheck_tries")
+
     def __init__(self, on_change, interval: float = 0.3):
         self._on_change = on_change
         self._interval = interval
         self._last_exe: str | None = None
         self._stop = threading.Event()
         self._thread: threading.Thread | None = None
+        self._thread_id = None
+        self._win_event_proc = None   # prevent GC of the hook callback
+        self._recheck_timer = 0       # pending UWP re-check (thread timer id)
+        self._recheck_tries = 0
 
     def start(self):
         if self._thread and self._thread.is_alive():
             return
         self._stop.clear()
-        self._thread = threading.Thread(target=self._poll, daemon=True, name="AppDetector")
+        self._thread = threading.Thread(target=self._run, daemon=True, name="AppDetector")
         self._thread.start()
 
     def stop(self):
         self._stop.set()
+        tid = self._thread_id
+        if tid:
+            user32.PostThreadMessageW(tid, WM_QUIT, 0, 0)
         if self._thread:
-            self._thread.join(timeout=2)
+            self._thread.join(timeout=self._interval + 0.1)
+        self._thread_id = None
 
     # ------------------------------------------------------------------
+    def _check(self, exe):
+        if exe and exe != self._last_exe:
+            self._last_exe = exe
+            self._on_change(exe)
+
+    def _on_win_event(self, _hook, _event, hwnd, _id_object, _id_child,
+                      _event_thread, _event_time):
+        """WinEvent callback — runs on the detector thread."""
+        self._recheck_tries = _UWP_RECHECK_TRIES
+        try:
+            self._check_and_recheck(get_foreground_exe(hwnd))
+        except Exception:
+            pass
+
+    def _check_and_recheck(self, exe):
+        """Like _check, but if *exe* is still the UWP frame host, arm a
+        one-shot timer to resolve the foreground window again shortly."""
+        self._check(exe)
+        if self._recheck_timer:
+            user32.KillTimer(None, self._recheck_timer)
+            self._recheck_timer = 0
+        if exe and exe.lower() == _UWP_FRAME_HOST and self._recheck_tries > 0:
+            self._recheck_tries -= 1
+            self._recheck_timer = user32.SetTimer(None, 0, _UWP_RECHECK_MS, None)
+
+    def _on_recheck_timer(self):
+        """Timer callback — runs on the detector thread."""
+        user32.KillTimer(None, self._recheck_timer)
+        self._recheck_timer = 0
+        try:
+            # A switch to another window would have fired its own event,
+            # so the current foreground window is the one to re-resolve.
+            self._check_and_recheck(get_foreground_exe())
+        except Exception:
+            pass
+
+    def _run(self):
+        try:
+            self._check(get_foreground_exe())
+        except Exception:
+            pass
+        try:
+            if self._run_event_hook():
+                return
+        except Exception as e:
+            print(f"[AppDetector] WinEvent hook error: {e}")
+        print("[AppDetector] WinEvent hook unavailable — falling back to polling")
+        self._poll()
+
+    def _run_event_hook(self):
+        """Install the foreground WinEvent hook and pump messages until
+        stopped.  Returns False if the hook could not be installed."""
+        self._win_event_proc = WINEVENTPROC(self._on_win_event)
+        hook = user32.SetWinEventHook(
+            EVENT_SYSTEM_FOREGROUND, EVENT_SYSTEM_FOREGROUND,
+            None, self._win_event_proc, 0, 0, WINEVENT_OUTOFCONTEXT,
+        )
+        if not hook:
+            self._win_event_proc = None
+            return False
+
+        msg = wt.MSG()
+        # Make sure this thread has a message queue before publishing its
+        # id, so a stop() racing with startup can always post WM_QUIT.
+        user32.PeekMessageW(ctypes.byref(msg), None, 0, 0, PM_NOREMOVE)
+        self._thread_id = kernel32.GetCurrentThreadId()
+        try:
+            while not self._stop.is_set():
+                result = user32.GetMessageW(ctypes.byref(msg), None, 0, 0)
+                if result == 0 or result == -1:
+                    break
+                if (msg.message == WM_TIMER and msg.hWnd is None
+                        and self._recheck_timer
+                        and msg.wParam == self._recheck_timer):
+                    self._on_recheck_timer()
+                    continue
+                user32.TranslateMessage(ctypes.byref(msg))
+                user32.DispatchMessageW(ctypes.byref(msg))
+        finally:
+            if self._recheck_timer:
+                user32.KillTimer(None, self._recheck_timer)
+                self._recheck_timer = 0
+            user32.UnhookWinEvent(hook)
+            self._win_event_proc = None
+        return True
+
     def _poll(self):
-        while not self._stop.is_set():
+        # _run already did the first check; the wait is the only blocking
+        # point, so stop() interrupts it immediately.
+        while not self._stop.wait(self._interval):
             try:
-                exe = get_foreground_exe()
-                if exe and exe != self._last_exe:
-                    self._last_exe = exe
-                    self._on_change(exe)
+                self._check(get_foreground_exe())
             except Exception:
                 pass
-            self._stop.wait(self._interval)
@@ -1,11 +1,19 @@
 """
 Configuration manager — loads/saves button mappings to a JSON file.
 Supports per-application profiles (for future use).
+Uses orjson for (de)serialization when installed, stdlib json otherwise.
 """
 
+import copy
 import json
 import os
 import sys
+import threading
+
+try:
+    import orjson as _orjson
+except ImportError:
+    _orjson = None
 
 CONFIG_DIR = os.path.join(os.environ.get("APPDATA", os.path.expanduser("~")), "LogiControl")
 CONFIG_FILE = os.path.join(CONFIG_DIR, "config.json")
@@ -31,8 +39,10 @@ BUTTON_TO_EVENTS = {
     "hscroll_right": ("hscroll_right",),
 }
 
+CURRENT_VERSION = 2
+
 DEFAULT_CONFIG = {
-    "version": 2,
+    "version": CURRENT_VERSION,
     "active_profile": "default",
     "profiles": {
         "default": {
@@ -58,6 +68,19 @@ DEFAULT_CONFIG = {
     },
 }
 
+
+def _leaf_paths(d, prefix=()):
+    """Yield the key path of every leaf value in a nested dict."""
+    for key, val in d.items():
+        if isinstance(val, dict) and val:
+            yield from _leaf_paths(val, prefix + (key,))
+        else:
+            yield prefix + (key,)
+
+
+# Every key path a loaded config must have — checked before merging defaults
+_REQUIRED_PATHS = tuple(_leaf_paths(DEFAULT_CONFIG))
+
 # Known applications for per-app profiles
 # Note: Modern UWP apps appear as their package exe (e.g. Microsoft.Media.Player.exe)
 # thanks to ApplicationFrameHost child-window resolution in app_detector.py.
@@ -73,16 +96,19 @@ KNOWN_APPS = {
 }
 
 
+# exe -> icon filename (relative to images/), resolved once at import
+_ICON_FOR_EXE = {}
+for _exe, _info in KNOWN_APPS.items():
+    _icon = _info.get("icon", "")
+    if _icon:
+        # If icon already has extension, use as-is; otherwise assume .png
+        _ICON_FOR_EXE[_exe] = _icon if "." in _icon else _icon + ".png"
+del _exe, _info, _icon
+
+
 def get_icon_for_exe(exe_name: str) -> str:
     """Return the icon image filename (relative to images/) for an exe, or ''."""
-    info = KNOWN_APPS.get(exe_name, {})
-    icon = info.get("icon", "")
-    if not icon:
-        return ""
-    # If icon already has extension, use as-is; otherwise assume .png
-    if "." in icon:
-        return icon
-    return icon + ".png"
+    return _ICON_FOR_EXE.get(exe_name, "")
 
 
 def ensure_config_dir():
@@ -94,22 +120,60 @@ def load_config():
     ensure_config_dir()
     if os.path.exists(CONFIG_FILE):
         try:
-            with open(CONFIG_FILE, "r", encoding="utf-8") as f:
-                cfg = json.load(f)
-            # Merge any missing keys from default
+            with open(CONFIG_FILE, "rb") as f:
+                cfg = _loads(f.read())
             cfg = _migrate(cfg)
-            cfg = _merge_defaults(cfg, DEFAULT_CONFIG)
+            # Merge any missing keys from default
+            if not _has_all_defaults(cfg):
+                cfg = _merge_defaults(cfg, DEFAULT_CONFIG)
+            _rebuild_app_index(cfg)
             return cfg
         except Exception as e:
             print(f"[Config] Error loading config: {e}")
-    return json.loads(json.dumps(DEFAULT_CONFIG))  # deep copy
+    cfg = copy.deepcopy(DEFAULT_CONFIG)
+    _rebuild_app_index(cfg)
+    return cfg
+
+
+def _dumps(cfg) -> bytes:
+    """Serialize cfg to indented UTF-8 JSON bytes."""
+    if _orjson is not None:
+        return _orjson.dumps(cfg, option=_orjson.OPT_INDENT_2)
+    return json.dumps(cfg, indent=2).encode("utf-8")
+
+
+def _loads(data: bytes):
+    """Parse JSON bytes into Python objects."""
+    if _orjson is not None:
+        return _orjson.loads(data)
+    return json.loads(data)
+
+
+# Bytes of the last successful save — lets save_config skip no-op writes
+_last_saved: bytes | None = None
+# save_config may run on the UI's writer thread and the UI thread
+_save_lock = threading.Lock()
 
 
 def save_config(cfg):
-    """Persist config to disk."""
-    ensure_config_dir()
-    with open(CONFIG_FILE, "w", encoding="utf-8") as f:
-        json.dump(cfg, f, indent=2)
+    """Persist config to disk.
+
+    Writes to a temp file and swaps it in with os.replace() so a crash
+    mid-write never leaves a truncated config behind.  Skips the write
+    entirely if nothing changed since the last save.
+    """
+    global _last_saved
+    data = _dumps(cfg)
+    with _save_lock:
+        if data == _last_saved and os.path.exists(CONFIG_FILE):
+            return
+        ensure_config_dir()
+        tmp = CONFIG_FILE + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+            f.flush()
+        os.replace(tmp, CONFIG_FILE)
+        _last_saved = data
 
 
 def get_active_mappings(cfg):
@@ -120,8 +184,11 @@ def get_active_mappings(cfg):
     return profile.get("mappings", DEFAULT_CONFIG["profiles"]["default"]["mappings"])
 
 
-def set_mapping(cfg, button, action_id, profile=None):
-    """Set a mapping for a button in the given profile (or active profile)."""
+def set_mapping(cfg, button, action_id, profile=None, save=True):
+    """Set a mapping for a button in the given profile (or active profile).
+
+    Pass save=False when the caller writes the config itself.
+    """
     if profile is None:
         profile = cfg.get("active_profile", "default")
     cfg["profiles"].setdefault(profile, {
@@ -129,11 +196,13 @@ def set_mapping(cfg, button, action_id, profile=None):
         "mappings": dict(DEFAULT_CONFIG["profiles"]["default"]["mappings"]),
     })
     cfg["profiles"][profile]["mappings"][button] = action_id
-    save_config(cfg)
+    if save:
+        save_config(cfg)
     return cfg
 
 
-def create_profile(cfg, name, label=None, copy_from="default", apps=None):
+def create_profile(cfg, name, label=None, copy_from="default", apps=None,
+                   save=True):
     """Create a new profile, optionally copying from an existing one."""
     if label is None:
         label = name
@@ -143,32 +212,79 @@ def create_profile(cfg, name, label=None, copy_from="default", apps=None):
         "apps": apps if apps is not None else [],
         "mappings": dict(source.get("mappings", {})),
     }
-    save_config(cfg)
+    _rebuild_app_index(cfg)
+    if save:
+        save_config(cfg)
     return cfg
 
 
-def delete_profile(cfg, name):
+def delete_profile(cfg, name, save=True):
     """Delete a profile (cannot delete 'default')."""
     if name == "default":
         return cfg
     cfg["profiles"].pop(name, None)
     if cfg["active_profile"] == name:
         cfg["active_profile"] = "default"
-    save_config(cfg)
+    _rebuild_app_index(cfg)
+    if save:
+        save_config(cfg)
     return cfg
 
 
-def get_profile_for_app(cfg, exe_name):
-    """Return the profile name that matches the given executable, or 'default'."""
+def build_app_index(cfg):
+    """Return a new exe.lower() -> profile name index for cfg's profiles."""
+    index = {}
     for pname, pdata in cfg.get("profiles", {}).items():
-        if exe_name and exe_name.lower() in [a.lower() for a in pdata.get("apps", [])]:
-            return pname
-    return "default"
+        for app in pdata.get("apps", []):
+            # First profile listing an app wins, as before
+            index.setdefault(app.lower(), pname)
+    return index
+
+
+# (cfg, index) for the config last looked up without an explicit index.
+# Rebuilt by load_config / create_profile / delete_profile, or lazily when
+# handed a different config object.  Always replaced with one assignment,
+# never mutated, so a reader on another thread sees a complete index that
+# belongs to the config next to it.
+_app_index = (None, {})
+
+
+def _rebuild_app_index(cfg):
+    global _app_index
+    index = build_app_index(cfg)
+    _app_index = (cfg, index)
+    return index
+
+
+def find_profile_for_app(cfg, exe_name, index=None):
+    """Return the profile that lists the given executable, or None.
+
+    Pass *index* (from build_app_index) to use a caller-owned index
+    instead of the shared one.
+    """
+    if index is None:
+        owner, index = _app_index
+        if owner is not cfg:
+            index = _rebuild_app_index(cfg)
+    return index.get(exe_name.lower())
+
+
+def get_profile_for_app(cfg, exe_name, index=None):
+    """Return the profile name that matches the given executable, or 'default'."""
+    if not exe_name:
+        return "default"
+    return find_profile_for_app(cfg, exe_name, index) or "default"
 
 
 def _migrate(cfg):
     """Migrate config from older versions to current."""
     version = cfg.get("version", 1)
+    if version == CURRENT_VERSION and not any(
+        a.lower() == "wmplayer.exe"
+        for pdata in cfg.get("profiles", {}).values()
+        for a in pdata.get("apps", [])
+    ):
+        return cfg
     if version < 2:
         # v1 → v2:  add 'apps' list to each profile, new settings keys
         for pdata in cfg.get("profiles", {}).values():
@@ -189,11 +305,23 @@ def _migrate(cfg):
     return cfg
 
 
+def _has_all_defaults(cfg):
+    """Return True if every key path in DEFAULT_CONFIG exists in cfg."""
+    for path in _REQUIRED_PATHS:
+        node = cfg
+        for key in path:
+            if not isinstance(node, dict) or key not in node:
+                return False
+            node = node[key]
+    return True
+
+
 def _merge_defaults(cfg, defaults):
     """Recursively merge missing keys from defaults into cfg."""
     for key, val in defaults.items():
         if key not in cfg:
-            cfg[key] = val
+            # Copy so later edits to cfg never leak into DEFAULT_CONFIG
+            cfg[key] = copy.deepcopy(val)
         elif isinstance(val, dict) and isinstance(cfg.get(key), dict):
             _merge_defaults(cfg[key], val)
     return cfg
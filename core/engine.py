@@ -6,13 +6,25 @@ Supports per-application auto-switching of profiles.
 
 import threading
 from core.mouse_hook import MouseHook, MouseEvent
-from core.key_simulator import execute_action
+from core.key_simulator import compile_action
 from core.config import (
-    load_config, get_active_mappings, get_profile_for_app,
+    load_config, get_active_mappings, get_profile_for_app, build_app_index,
     BUTTON_TO_EVENTS, save_config,
 )
 from core.app_detector import AppDetector
 
+# Print profile auto-switch decisions (one line per foreground change)
+DEBUG = False
+
+# btn_key -> (events that fire an action, events that are only blocked)
+_BTN_SPLIT = {
+    btn: (tuple(e for e in evts if not e.endswith("_up")),
+          tuple(e for e in evts if e.endswith("_up")))
+    for btn, evts in BUTTON_TO_EVENTS.items()
+}
+_NO_EVENTS = ((), ())
+_HSCROLL_EVENTS = frozenset((MouseEvent.HSCROLL_LEFT, MouseEvent.HSCROLL_RIGHT))
+
 
 class Engine:
     """
@@ -24,12 +36,19 @@ class Engine:
     def __init__(self):
         self.hook = MouseHook()
         self.cfg = load_config()
+        # exe -> profile for self.cfg, owned here so the detector thread
+        # never shares config.py's index with the UI
+        self._app_index = build_app_index(self.cfg)
         self._enabled = True
         self._hscroll_accum = 0
         self._current_profile: str = self.cfg.get("active_profile", "default")
         self._app_detector = AppDetector(self._on_app_change)
         self._profile_change_cb = None       # UI callback
+        self._dpi_read_cb = None             # UI callback for initial DPI
+        self._device_dpi = None              # last DPI read from the device
         self._lock = threading.Lock()
+        self._action_cache = {}              # action_id -> compiled action
+        self._bindings = None                # table from _build_bindings
         self._setup_hooks()
 
     # ------------------------------------------------------------------
@@ -37,41 +56,76 @@ class Engine:
     # ------------------------------------------------------------------
     def _setup_hooks(self):
         """Register callbacks and block events for all mapped buttons."""
-        mappings = get_active_mappings(self.cfg)
+        self._install_bindings(self.cfg, self._build_bindings(self.cfg))
+
+    def _build_bindings(self, cfg, base=None):
+        """Build the hook binding table for *cfg* without touching the hook,
+        so it can be done outside the lock.
 
+        Returns ``(mappings, callbacks, blocked)``.  Given *base*, the table
+        currently installed, only buttons whose action changed are rebuilt
+        and the rest is shared — switching between profiles with the same
+        mappings builds nothing.
+        """
+        mappings = dict(get_active_mappings(cfg))
+        if base is None:
+            callbacks, blocked = {}, set()
+            changed = list(mappings.items())
+        else:
+            old, callbacks, blocked = base
+            callbacks, blocked = dict(callbacks), set(blocked)
+            changed = [(k, mappings.get(k, "none"))
+                       for k in old.keys() | mappings.keys()
+                       if old.get(k, "none") != mappings.get(k, "none")]
+            for btn_key, _ in changed:
+                for evts in _BTN_SPLIT.get(btn_key, _NO_EVENTS):
+                    for evt_type in evts:
+                        callbacks.pop(evt_type, None)
+                        blocked.discard(evt_type)
+
+        for btn_key, action_id in changed:
+            if action_id == "none":
+                continue
+            down, up = _BTN_SPLIT.get(btn_key, _NO_EVENTS)
+            blocked.update(down)
+            blocked.update(up)
+            for evt_type in down:
+                if evt_type in _HSCROLL_EVENTS:
+                    handler = self._make_hscroll_handler(action_id)
+                else:
+                    handler = self._make_handler(action_id)
+                callbacks.setdefault(evt_type, []).append(handler)
+        return mappings, callbacks, blocked
+
+    def _install_bindings(self, cfg, table):
+        """Swap *table* into the hook.  Fast; call with the lock held."""
+        _, callbacks, blocked = table
+        self.hook.set_bindings(callbacks, blocked)
         # Apply scroll inversion settings to the hook
-        settings = self.cfg.get("settings", {})
+        settings = cfg.get("settings", {})
         self.hook.invert_vscroll = settings.get("invert_vscroll", False)
         self.hook.invert_hscroll = settings.get("invert_hscroll", False)
+        self._bindings = table
 
-        for btn_key, action_id in mappings.items():
-            events = list(BUTTON_TO_EVENTS.get(btn_key, ()))
-
-            for evt_type in events:
-                if evt_type.endswith("_up"):
-                    if action_id != "none":
-                        self.hook.block(evt_type)
-                    continue
-
-                if action_id != "none":
-                    self.hook.block(evt_type)
-
-                    if "hscroll" in evt_type:
-                        self.hook.register(evt_type, self._make_hscroll_handler(action_id))
-                    else:
-                        self.hook.register(evt_type, self._make_handler(action_id))
+    def _compiled(self, action_id):
+        cb = self._action_cache.get(action_id)
+        if cb is None:
+            cb = self._action_cache[action_id] = compile_action(action_id)
+        return cb
 
     def _make_handler(self, action_id):
+        run = self._compiled(action_id)
         def handler(event):
             if self._enabled:
-                execute_action(action_id)
+                run()
         return handler
 
     def _make_hscroll_handler(self, action_id):
+        run = self._compiled(action_id)
         def handler(event):
             if not self._enabled:
                 return
-            execute_action(action_id)
+            run()
         return handler
 
     # ------------------------------------------------------------------
@@ -79,19 +133,29 @@ class Engine:
     # ------------------------------------------------------------------
     def _on_app_change(self, exe_name: str):
         """Called by AppDetector when foreground window changes."""
-        target = get_profile_for_app(self.cfg, exe_name)
+        target = get_profile_for_app(self.cfg, exe_name, self._app_index)
         if target == self._current_profile:
             return
-        print(f"[Engine] App changed to {exe_name} -> profile '{target}'")
+        if DEBUG:
+            print(f"[Engine] App changed to {exe_name} -> profile '{target}'")
         self._switch_profile(target)
 
     def _switch_profile(self, profile_name: str):
         with self._lock:
             self.cfg["active_profile"] = profile_name
             self._current_profile = profile_name
-            # Lightweight: just re-wire callbacks, keep hook + HID++ alive
-            self.hook.reset_bindings()
-            self._setup_hooks()
+            cfg, base = self.cfg, self._bindings
+        # Lightweight: build the new bindings outside the lock (only the
+        # changed buttons), then swap them in; hook + HID++ stay alive
+        table = self._build_bindings(cfg, base)
+        with self._lock:
+            if self.cfg is not cfg or self._bindings is not base:
+                # reload_mappings() swapped in a new config meanwhile; the
+                # table above was built from the old one
+                self.cfg["active_profile"] = profile_name
+                self._current_profile = profile_name
+                table = self._build_bindings(self.cfg, self._bindings)
+            self._install_bindings(self.cfg, table)
         # Notify UI (if connected)
         if self._profile_change_cb:
             try:
@@ -106,10 +170,14 @@ class Engine:
     # ------------------------------------------------------------------
     # Public API
     # ------------------------------------------------------------------
-    def set_dpi(self, dpi_value):
-        """Send DPI change to the mouse via HID++."""
+    def set_dpi(self, dpi_value, save=True):
+        """Send DPI change to the mouse via HID++.
+
+        Pass save=False when the caller persists the config itself.
+        """
         self.cfg.setdefault("settings", {})["dpi"] = dpi_value
-        save_config(self.cfg)
+        if save:
+            save_config(self.cfg)
         # Try via the hook's HidGestureListener
         hg = self.hook._hid_gesture
         if hg:
@@ -117,44 +185,67 @@ class Engine:
         print("[Engine] No HID++ connection — DPI not applied")
         return False
 
-    def reload_mappings(self):
+    def reload_mappings(self, cfg=None):
         """
         Called by the UI when the user changes a mapping.
         Re-wire callbacks without tearing down the hook or HID++.
+        Pass *cfg* (a copy the engine may keep) to skip re-reading the
+        config file.
         """
+        if cfg is None:
+            cfg = load_config()
+        # The caller's active_profile can lag an auto-switch made on the
+        # detector thread; keep the engine's profile unless it was deleted
+        profiles = cfg.get("profiles", {})
+        current = self._current_profile
+        if current in profiles:
+            cfg["active_profile"] = current
+        table = self._build_bindings(cfg)
+        app_index = build_app_index(cfg)
         with self._lock:
-            self.cfg = load_config()
-            self._current_profile = self.cfg.get("active_profile", "default")
-            self.hook.reset_bindings()
-            self._setup_hooks()
+            if (self._current_profile != current
+                    and self._current_profile in profiles):
+                # Auto-switched while the table was being built
+                cfg["active_profile"] = self._current_profile
+                table = self._build_bindings(cfg)
+            self.cfg = cfg
+            self._app_index = app_index
+            self._current_profile = cfg.get("active_profile", "default")
+            self._install_bindings(cfg, table)
 
     def set_enabled(self, enabled):
         self._enabled = enabled
 
     def start(self):
+        # Read current DPI from the device as soon as HID++ connects
+        # (don't overwrite it)
+        self.hook.set_hid_ready_callback(self._on_hid_ready)
         self.hook.start()
         self._app_detector.start()
-        # Read current DPI from device on startup (don't overwrite it)
-        self._dpi_read_cb = None   # UI callback for initial DPI
-        def _read_dpi():
-            import time
-            time.sleep(3)  # give HID++ time to connect
-            hg = self.hook._hid_gesture
-            if hg:
-                current = hg.read_dpi()
-                if current is not None:
-                    self.cfg.setdefault("settings", {})["dpi"] = current
-                    save_config(self.cfg)
-                    if self._dpi_read_cb:
-                        try:
-                            self._dpi_read_cb(current)
-                        except Exception:
-                            pass
-        threading.Thread(target=_read_dpi, daemon=True).start()
+
+    def _on_hid_ready(self, hg):
+        """Called on the HID++ listener thread once the device is connected."""
+        current = hg.read_dpi()
+        if current is None:
+            return
+        self._device_dpi = current
+        self.cfg.setdefault("settings", {})["dpi"] = current
+        save_config(self.cfg)
+        if self._dpi_read_cb:
+            try:
+                self._dpi_read_cb(current)
+            except Exception:
+                pass
 
     def set_dpi_read_callback(self, cb):
         """Register a callback ``cb(dpi_value)`` invoked when DPI is read from device."""
         self._dpi_read_cb = cb
+        # The device may have connected before the UI registered
+        if cb and self._device_dpi is not None:
+            try:
+                cb(self._device_dpi)
+            except Exception:
+                pass
 
     def stop(self):
         self._app_detector.stop()
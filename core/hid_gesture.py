@@ -14,6 +14,8 @@ Requires:  pip install hidapi
 Falls back gracefully if the package or device are unavailable.
 """
 
+import collections
+import struct
 import threading
 import time
 
@@ -39,11 +41,28 @@ CID_GESTURE    = 0x00C3      # "Mouse Gesture Button"
 
 MY_SW          = 0x0A        # arbitrary software-id used in our requests
 
+# Per-event and discovery chatter is printed only when DEBUG is set, so
+# normal runs skip the formatting and console writes entirely.
+DEBUG          = False
+
+_TX_HDR        = struct.Struct("<BBBB")  # report id, dev idx, feat, func|sw
+_TX_PAD        = bytes(LONG_LEN - 4)   # zeroes for a long report's params
+_U16BE         = struct.Struct(">H")    # CIDs are big-endian u16
+
+DPI_COALESCE_S = 0.02        # a queued DPI write waits this long for newer ones
+
 
 # ── Helpers ───────────────────────────────────────────────────────
 
+def set_debug(enabled):
+    """Turn verbose HID++ logging on or off at runtime."""
+    global DEBUG
+    DEBUG = bool(enabled)
+
+
 def _parse(raw):
     """Parse a read buffer → (dev_idx, feat_idx, func, sw, params) or None.
+    *params* is a zero-copy memoryview over the tail of *raw*.
 
     On Windows the hidapi C backend strips the report-ID byte, so the
     first byte is device-index.  On other platforms / future versions
@@ -60,7 +79,7 @@ def _parse(raw):
     fsw    = raw[off + 2]
     func   = (fsw >> 4) & 0x0F
     sw     = fsw & 0x0F
-    params = raw[off + 3:]
+    params = memoryview(raw)[off + 3:]
     return dev, feat, func, sw, params
 
 
@@ -69,9 +88,10 @@ def _parse(raw):
 class HidGestureListener:
     """Background thread: diverts the gesture button and listens via HID++."""
 
-    def __init__(self, on_down=None, on_up=None):
+    def __init__(self, on_down=None, on_up=None, on_ready=None):
         self._on_down   = on_down
         self._on_up     = on_up
+        self._on_ready  = on_ready      # on_ready(listener) after connect
         self._dev       = None          # hid.device()
         self._thread    = None
         self._running   = False
@@ -79,8 +99,17 @@ class HidGestureListener:
         self._dpi_idx   = None          # feature index of ADJUSTABLE_DPI
         self._dev_idx   = BT_DEV_IDX
         self._held      = False
-        self._pending_dpi = None        # set by set_dpi(), applied in loop
-        self._dpi_result  = None        # True/False after apply
+        self._tx_buf    = bytearray(LONG_LEN)   # reused by _tx
+        # Once connected, a reader thread owns dev.read(); responses to
+        # our requests reach _request through this queue
+        self._reading   = False
+        self._resp_q    = collections.deque(maxlen=128)
+        self._resp_cv   = threading.Condition()
+        # DPI commands queued by set_dpi()/read_dpi(), run in order on the
+        # listener thread: [kind, dpi, [(done Event, [result]), ...]]
+        self._cmd_queue = collections.deque()
+        self._cmd_lock  = threading.Lock()
+        self._cmd_event = threading.Event()
 
     # ── public API ────────────────────────────────────────────────
 
@@ -96,6 +125,12 @@ class HidGestureListener:
 
     def stop(self):
         self._running = False
+        self._cmd_event.set()
+        # The listener joins the reader (at most one 100 ms read) and
+        # closes the device itself; closing it under an in-flight read
+        # from another thread is not safe with hidapi.
+        if self._thread:
+            self._thread.join(timeout=3)
         d = self._dev
         if d:
             try:
@@ -103,8 +138,6 @@ class HidGestureListener:
             except Exception:
                 pass
             self._dev = None
-        if self._thread:
-            self._thread.join(timeout=3)
 
     # ── device discovery ──────────────────────────────────────────
 
@@ -125,14 +158,13 @@ class HidGestureListener:
     def _tx(self, report_id, feat, func, params):
         """Transmit an HID++ message.  Always uses 20-byte long format
         because BLE HID collections typically only support long output reports."""
-        buf = [0] * LONG_LEN
-        buf[0] = LONG_ID                 # always long for BLE compat
-        buf[1] = self._dev_idx
-        buf[2] = feat
-        buf[3] = ((func & 0x0F) << 4) | (MY_SW & 0x0F)
-        for i, b in enumerate(params):
-            if 4 + i < LONG_LEN:
-                buf[4 + i] = b & 0xFF
+        buf = self._tx_buf               # only used on the listener thread
+        # always long for BLE compat
+        _TX_HDR.pack_into(buf, 0, LONG_ID, self._dev_idx, feat,
+                          ((func & 0x0F) << 4) | (MY_SW & 0x0F))
+        n = min(len(params), LONG_LEN - 4)
+        buf[4:4 + n] = bytes(params[:n])   # params are byte values
+        buf[4 + n:] = _TX_PAD[n:]
         self._dev.write(buf)
 
     def _rx(self, timeout_ms=2000):
@@ -142,19 +174,66 @@ class HidGestureListener:
             return None
         try:
             d = dev.read(64, timeout_ms)
-            return list(d) if d else None
+            return bytes(d) if d else None
         except Exception:
             return None
 
+    def _next_response(self, timeout_ms):
+        """Return the next report that may answer a request, or None.
+        Reads the device directly until the reader thread is running,
+        then takes what it routed to the response queue."""
+        if not self._reading:
+            return self._rx(timeout_ms)
+        with self._resp_cv:
+            if not self._resp_q:
+                self._resp_cv.wait(timeout_ms / 1000)
+            return self._resp_q.popleft() if self._resp_q else None
+
+    def _reader_loop(self, dev):
+        """Reader thread: route each report as soon as it arrives —
+        notifications straight to _on_report, so gesture latency never
+        depends on an in-flight HID++ request; responses to our requests
+        (and HID++ errors) to the response queue for _request."""
+        try:
+            while self._running and self._reading:
+                d = dev.read(64, 100)
+                if not d:
+                    continue
+                raw = bytes(d)
+                if len(raw) < 4:
+                    continue
+                off = 1 if raw[0] in (SHORT_ID, LONG_ID) else 0
+                if len(raw) < off + 3:
+                    continue
+                if raw[off + 1] == 0xFF or raw[off + 2] & 0x0F == MY_SW:
+                    with self._resp_cv:
+                        self._resp_q.append(raw)
+                        self._resp_cv.notify()
+                else:
+                    self._on_report(raw)
+        except Exception as e:
+            if self._running:
+                print(f"[HidGesture] read error: {e}")
+        finally:
+            self._reading = False
+            self._cmd_event.set()      # wake _main_loop to reconnect
+
     def _request(self, feat, func, params, timeout_ms=2000):
-        """Send a long HID++ request, wait for matching response."""
+        """Send a long HID++ request, wait for matching response.
+
+        Only called on the listener thread.  Before the reader thread
+        starts, this is the only reader, so reports that are not the
+        response (e.g. gesture notifications arriving mid-request) are
+        handed to _on_report instead of dropped.
+        """
+        self._resp_q.clear()           # drop stale responses
         try:
             self._tx(LONG_ID, feat, func, params)
         except Exception:
             return None
-        deadline = time.time() + timeout_ms / 1000
-        while time.time() < deadline:
-            raw = self._rx(min(500, timeout_ms))
+        deadline = time.monotonic() + timeout_ms / 1000
+        while time.monotonic() < deadline:
+            raw = self._next_response(min(500, timeout_ms))
             if raw is None:
                 continue
             msg = _parse(raw)
@@ -165,12 +244,14 @@ class HidGestureListener:
             # HID++ error (feature-index 0xFF)
             if r_feat == 0xFF:
                 code = r_params[1] if len(r_params) > 1 else 0
-                print(f"[HidGesture] HID++ error 0x{code:02X} "
-                      f"for feat=0x{feat:02X} func={func}")
+                if DEBUG:
+                    print(f"[HidGesture] HID++ error 0x{code:02X} "
+                          f"for feat=0x{feat:02X} func={func}")
                 return None
 
             if r_feat == feat and r_sw == MY_SW:
                 return msg
+            self._on_report(raw)
         return None
 
     # ── feature helpers ───────────────────────────────────────────
@@ -196,8 +277,9 @@ class HidGestureListener:
         # flags: divert=1 (bit 0), dvalid=1 (bit 1) → 0x03
         resp = self._request(self._feat_idx, 3, [hi, lo, 0x03])
         ok = resp is not None
-        print(f"[HidGesture] Divert CID 0x{CID_GESTURE:04X}: "
-              f"{'OK' if ok else 'FAILED'}")
+        if DEBUG or not ok:
+            print(f"[HidGesture] Divert CID 0x{CID_GESTURE:04X}: "
+                  f"{'OK' if ok else 'FAILED'}")
         return ok
 
     def _undivert(self):
@@ -214,30 +296,73 @@ class HidGestureListener:
 
     # ── DPI control ───────────────────────────────────────────────
 
+    def _submit(self, kind, dpi=None, timeout=3.0):
+        """Queue a DPI command for the listener thread and wait for its
+        result.  Returns (completed, result)."""
+        if threading.current_thread() is self._thread:
+            # Already on the listener thread (e.g. from on_ready): run it
+            # directly, since nothing else would drain the queue.
+            if kind == "read":
+                return True, self._apply_read_dpi()
+            return True, self._apply_dpi(dpi)
+        done = threading.Event()
+        box = [None]
+        with self._cmd_lock:
+            q = self._cmd_queue
+            if kind == "set" and q and q[-1][0] == "set":
+                # The last queued write hasn't been sent yet: retarget it
+                # instead of queueing another one.  Only the tail is
+                # touched, so a write never moves past a read.
+                q[-1][1] = dpi
+                q[-1][2].append((done, box))
+            else:
+                q.append([kind, dpi, [(done, box)]])
+        self._cmd_event.set()
+        return done.wait(timeout), box[0]
+
+    def _run_commands(self):
+        """Called from the listener thread: run queued DPI commands in order.
+
+        A write waits DPI_COALESCE_S before it is sent, so set_dpi() calls
+        made meanwhile retarget it and a burst costs one HID++ request.
+        Every caller of a coalesced write gets its result.
+        """
+        self._cmd_event.clear()
+        q = self._cmd_queue
+        lock = self._cmd_lock
+        while True:
+            with lock:
+                if not q:
+                    return
+                is_set = q[0][0] == "set"
+            if is_set:
+                time.sleep(DPI_COALESCE_S)
+            with lock:
+                kind, dpi, waiters = q.popleft()
+            if kind == "read":
+                result = self._apply_read_dpi()
+            else:
+                result = self._apply_dpi(dpi)
+            for done, box in waiters:
+                box[0] = result
+                done.set()
+
     def set_dpi(self, dpi_value):
         """Queue a DPI change — will be applied on the listener thread.
         Can be called from any thread.  Returns True on success."""
         dpi = max(200, min(8200, int(dpi_value)))  # MX Master 3S max is 8000
-        self._dpi_result = None
-        self._pending_dpi = dpi
         # Wait up to 3s for the listener thread to apply it
-        for _ in range(30):
-            if self._pending_dpi is None:
-                return self._dpi_result is True
-            time.sleep(0.1)
-        print("[HidGesture] DPI set timed out")
-        return False
+        completed, ok = self._submit("set", dpi)
+        if not completed:
+            print("[HidGesture] DPI set timed out")
+            return False
+        return ok is True
 
-    def _apply_pending_dpi(self):
+    def _apply_dpi(self, dpi):
         """Called from the listener thread to actually send DPI."""
-        dpi = self._pending_dpi
-        if dpi is None:
-            return
         if self._dpi_idx is None or self._dev is None:
             print("[HidGesture] Cannot set DPI — not connected")
-            self._dpi_result = False
-            self._pending_dpi = None
-            return
+            return False
         hi = (dpi >> 8) & 0xFF
         lo = dpi & 0xFF
         # setSensorDpi: function 3, params [sensorIdx=0, dpi_hi, dpi_lo]
@@ -246,71 +371,67 @@ class HidGestureListener:
         if resp:
             _, _, _, _, p = resp
             actual = (p[1] << 8 | p[2]) if len(p) >= 3 else dpi
-            print(f"[HidGesture] DPI set to {actual}")
-            self._dpi_result = True
-        else:
-            print("[HidGesture] DPI set FAILED")
-            self._dpi_result = False
-        self._pending_dpi = None
+            if DEBUG:
+                print(f"[HidGesture] DPI set to {actual}")
+            return True
+        print("[HidGesture] DPI set FAILED")
+        return False
 
     def read_dpi(self):
         """Queue a DPI read — will be applied on the listener thread.
         Can be called from any thread.  Returns the DPI value or None."""
-        self._dpi_result = None
-        self._pending_dpi = "read"  # special sentinel
-        for _ in range(30):
-            if self._pending_dpi is None:
-                return self._dpi_result
-            time.sleep(0.1)
-        print("[HidGesture] DPI read timed out")
-        return None
+        completed, current = self._submit("read")
+        if not completed:
+            print("[HidGesture] DPI read timed out")
+            return None
+        return current
 
-    def _apply_pending_read_dpi(self):
+    def _apply_read_dpi(self):
         """Called from the listener thread to read current DPI."""
         if self._dpi_idx is None or self._dev is None:
-            self._dpi_result = None
-            self._pending_dpi = None
-            return
+            return None
         # getSensorDpi: function 2, params [sensorIdx=0]
         resp = self._request(self._dpi_idx, 2, [0x00])
         if resp:
             _, _, _, _, p = resp
             current = (p[1] << 8 | p[2]) if len(p) >= 3 else None
-            print(f"[HidGesture] Current DPI = {current}")
-            self._dpi_result = current
-        else:
-            print("[HidGesture] DPI read FAILED")
-            self._dpi_result = None
-        self._pending_dpi = None
+            if DEBUG:
+                print(f"[HidGesture] Current DPI = {current}")
+            return current
+        print("[HidGesture] DPI read FAILED")
+        return None
 
     # ── notification handling ─────────────────────────────────────
 
     def _on_report(self, raw):
         """Inspect an incoming HID++ report for a divertedButtonsEvent."""
-        msg = _parse(raw)
-        if msg is None:
+        # Check the header bytes in place first — most reports are not
+        # ours, and they should cost no more than this.  Same layout
+        # detection as _parse.
+        if len(raw) < 4:
+            return
+        off = 1 if raw[0] in (SHORT_ID, LONG_ID) else 0
+        if len(raw) < off + 3:
             return
-        _, feat, func, _sw, params = msg
-
         # Only care about notifications from REPROG_CONTROLS_V4, event 0
-        if feat != self._feat_idx or func != 0:
+        if raw[off + 1] != self._feat_idx or raw[off + 2] >> 4:
             return
+        params = memoryview(raw)[off + 3:]
 
-        # Params: sequential CID pairs terminated by 0x0000
-        cids = set()
-        i = 0
-        while i + 1 < len(params):
-            c = (params[i] << 8) | params[i + 1]
+        # Params: sequential CID pairs terminated by 0x0000; we only
+        # need to know whether the gesture CID is among them
+        gesture_now = False
+        for (c,) in _U16BE.iter_unpack(params[:len(params) & ~1]):
             if c == 0:
                 break
-            cids.add(c)
-            i += 2
-
-        gesture_now = CID_GESTURE in cids
+            if c == CID_GESTURE:
+                gesture_now = True
+                break
 
         if gesture_now and not self._held:
             self._held = True
-            print("[HidGesture] Gesture DOWN")
+            if DEBUG:
+                print("[HidGesture] Gesture DOWN")
             if self._on_down:
                 try:
                     self._on_down()
@@ -319,7 +440,8 @@ class HidGestureListener:
 
         elif not gesture_now and self._held:
             self._held = False
-            print("[HidGesture] Gesture UP")
+            if DEBUG:
+                print("[HidGesture] Gesture UP")
             if self._on_up:
                 try:
                     self._on_up()
@@ -353,13 +475,15 @@ class HidGestureListener:
                 fi = self._find_feature(FEAT_REPROG_V4)
                 if fi is not None:
                     self._feat_idx = fi
-                    print(f"[HidGesture] Found REPROG_V4 @0x{fi:02X}  "
-                          f"PID=0x{pid:04X} devIdx=0x{idx:02X}")
+                    if DEBUG:
+                        print(f"[HidGesture] Found REPROG_V4 @0x{fi:02X}  "
+                              f"PID=0x{pid:04X} devIdx=0x{idx:02X}")
                     # Also discover ADJUSTABLE_DPI
                     dpi_fi = self._find_feature(FEAT_ADJ_DPI)
                     if dpi_fi:
                         self._dpi_idx = dpi_fi
-                        print(f"[HidGesture] Found ADJUSTABLE_DPI @0x{dpi_fi:02X}")
+                        if DEBUG:
+                            print(f"[HidGesture] Found ADJUSTABLE_DPI @0x{dpi_fi:02X}")
                     if self._divert():
                         return True
                     break        # right device but divert failed
@@ -381,23 +505,30 @@ class HidGestureListener:
                 for _ in range(50):
                     if not self._running:
                         return
-                    time.sleep(0.1)
+                    # Fail queued DPI commands now rather than on timeout
+                    if self._cmd_event.wait(0.1):
+                        self._run_commands()
                 continue
 
             print("[HidGesture] Listening for gesture events…")
-            try:
-                while self._running:
-                    # Apply any queued DPI command
-                    if self._pending_dpi is not None:
-                        if self._pending_dpi == "read":
-                            self._apply_pending_read_dpi()
-                        else:
-                            self._apply_pending_dpi()
-                    raw = self._rx(1000)
-                    if raw:
-                        self._on_report(raw)
-            except Exception as e:
-                print(f"[HidGesture] read error: {e}")
+            if self._on_ready:
+                try:
+                    self._on_ready(self)
+                except Exception as e:
+                    print(f"[HidGesture] ready callback error: {e}")
+            # Reads move to their own thread; this one just runs DPI
+            # commands until the reader stops (disconnect or stop())
+            self._reading = True
+            reader = threading.Thread(
+                target=self._reader_loop, args=(self._dev,),
+                daemon=True, name="HidGestureRx")
+            reader.start()
+            cmd_event = self._cmd_event
+            while self._running and self._reading:
+                if cmd_event.wait(0.5):
+                    self._run_commands()
+            self._reading = False
+            reader.join(timeout=1)
 
             # Cleanup before potential reconnect
             self._undivert()
@@ -410,5 +541,7 @@ class HidGestureListener:
             self._feat_idx = None
             self._held = False
 
-            if self._running:
-                time.sleep(2)
+            for _ in range(20):
+                if not self._running:
+                    break
+                time.sleep(0.1)
@@ -6,6 +6,7 @@ and browser navigation keys.
 
 import ctypes
 import ctypes.wintypes as wintypes
+import threading
 import time
 from ctypes import Structure, Union, c_ulong, c_ushort, c_long, sizeof
 
@@ -119,6 +120,7 @@ class INPUT(Structure):
 SendInput = ctypes.windll.user32.SendInput
 SendInput.argtypes = [c_ulong, ctypes.POINTER(INPUT), ctypes.c_int]
 SendInput.restype = c_ulong
+_INPUT_SIZE = sizeof(INPUT)
 
 # Scroll event flags
 MOUSEEVENTF_WHEEL  = 0x0800
@@ -131,22 +133,49 @@ def inject_scroll(flags, delta):
     flags: MOUSEEVENTF_WHEEL or MOUSEEVENTF_HWHEEL
     delta: signed scroll amount (positive = up/right, negative = down/left)
     """
-    inp = INPUT()
-    inp.type = INPUT_MOUSE
-    inp.union.mi.mouseData = delta & 0xFFFFFFFF
-    inp.union.mi.dwFlags = flags
-    arr = (INPUT * 1)(inp)
-    SendInput(1, arr, sizeof(INPUT))
+    inject_scroll_batch(((flags, delta),))
 
 
-def _make_key_input(vk, flags=0):
-    """Create a keyboard INPUT structure."""
-    inp = INPUT()
-    inp.type = INPUT_KEYBOARD
-    inp.union.ki.wVk = vk
-    inp.union.ki.dwFlags = flags
-    inp.union.ki.dwExtraInfo = ctypes.pointer(c_ulong(0))
-    return inp
+# One preallocated INPUT per scroll axis, refilled in place for every
+# injection (inverted scroll can fire at 100+ Hz)
+_SCROLL_ARR = (INPUT * 2)()
+for _inp in _SCROLL_ARR:
+    _inp.type = INPUT_MOUSE
+_SCROLL_MI = (_SCROLL_ARR[0].union.mi, _SCROLL_ARR[1].union.mi)
+_SCROLL_LOCK = threading.Lock()
+del _inp
+
+
+def inject_scroll_batch(pairs):
+    """Inject several scroll events with a single SendInput call.
+
+    pairs: sequence of (flags, delta) as taken by inject_scroll
+    """
+    n = len(pairs)
+    if n > len(_SCROLL_ARR):
+        for i in range(0, n, len(_SCROLL_ARR)):
+            inject_scroll_batch(pairs[i:i + len(_SCROLL_ARR)])
+        return
+    with _SCROLL_LOCK:
+        for mi, (flags, delta) in zip(_SCROLL_MI, pairs):
+            mi.mouseData = delta & 0xFFFFFFFF
+            mi.dwFlags = flags
+        SendInput(n, _SCROLL_ARR, _INPUT_SIZE)
+
+
+# Reusable keyboard INPUT arrays keyed by length, filled in place by
+# send_key_combo.  The lock keeps two callers from sharing one array.
+_INPUT_POOL = {}
+_INPUT_POOL_LOCK = threading.Lock()
+
+
+def _keyboard_array(n):
+    arr = _INPUT_POOL.get(n)
+    if arr is None:
+        arr = _INPUT_POOL[n] = (INPUT * n)()
+        for inp in arr:
+            inp.type = INPUT_KEYBOARD
+    return arr
 
 
 def send_key_combo(keys, hold_ms=50):
@@ -155,18 +184,21 @@ def send_key_combo(keys, hold_ms=50):
     `keys` is a list of VK codes, e.g. [VK_MENU, VK_TAB].
     All keys are pressed in order, then released in reverse order.
     """
-    inputs = []
-    # Press all keys
-    for vk in keys:
-        flags = KEYEVENTF_EXTENDEDKEY if _is_extended(vk) else 0
-        inputs.append(_make_key_input(vk, flags))
-    # Release all keys in reverse
-    for vk in reversed(keys):
-        flags = KEYEVENTF_KEYUP | (KEYEVENTF_EXTENDEDKEY if _is_extended(vk) else 0)
-        inputs.append(_make_key_input(vk, flags))
-
-    arr = (INPUT * len(inputs))(*inputs)
-    SendInput(len(inputs), arr, sizeof(INPUT))
+    n = 2 * len(keys)
+    if not n:
+        return
+    with _INPUT_POOL_LOCK:
+        arr = _keyboard_array(n)
+        # Press all keys, then release them in reverse
+        for i, vk in enumerate(keys):
+            ext = KEYEVENTF_EXTENDEDKEY if (_EXTENDED_MASK >> vk) & 1 else 0
+            ki = arr[i].union.ki
+            ki.wVk = vk
+            ki.dwFlags = ext
+            ki = arr[n - 1 - i].union.ki
+            ki.wVk = vk
+            ki.dwFlags = KEYEVENTF_KEYUP | ext
+        SendInput(n, arr, _INPUT_SIZE)
 
 
 def send_key_press(vk):
@@ -174,18 +206,22 @@ def send_key_press(vk):
     send_key_combo([vk])
 
 
+_EXTENDED = frozenset((
+    VK_BROWSER_BACK, VK_BROWSER_FORWARD, VK_BROWSER_REFRESH,
+    VK_BROWSER_STOP, VK_BROWSER_HOME,
+    VK_VOLUME_MUTE, VK_VOLUME_DOWN, VK_VOLUME_UP,
+    VK_MEDIA_NEXT_TRACK, VK_MEDIA_PREV_TRACK,
+    VK_MEDIA_STOP, VK_MEDIA_PLAY_PAUSE,
+    VK_LEFT, VK_RIGHT, VK_UP, VK_DOWN,
+    VK_DELETE, VK_RETURN, VK_TAB,
+))
+# Same set as a bitmap over the 256 VK codes: bit vk is set if extended
+_EXTENDED_MASK = sum(1 << vk for vk in _EXTENDED)
+
+
 def _is_extended(vk):
     """Check if a VK code is an extended key."""
-    extended = {
-        VK_BROWSER_BACK, VK_BROWSER_FORWARD, VK_BROWSER_REFRESH,
-        VK_BROWSER_STOP, VK_BROWSER_HOME,
-        VK_VOLUME_MUTE, VK_VOLUME_DOWN, VK_VOLUME_UP,
-        VK_MEDIA_NEXT_TRACK, VK_MEDIA_PREV_TRACK,
-        VK_MEDIA_STOP, VK_MEDIA_PLAY_PAUSE,
-        VK_LEFT, VK_RIGHT, VK_UP, VK_DOWN,
-        VK_DELETE, VK_RETURN, VK_TAB,
-    }
-    return vk in extended
+    return bool((_EXTENDED_MASK >> vk) & 1)
 
 
 # ----------------------------------------------------------------
@@ -306,9 +342,49 @@ ACTIONS = {
 }
 
 
+def _precompile(keys):
+    """Build the full press-then-reverse-release INPUT array for *keys*.
+    Returns ``(array, count)``."""
+    events = [(vk, 0) for vk in keys]
+    events += [(vk, KEYEVENTF_KEYUP) for vk in reversed(keys)]
+    n = len(events)
+    arr = (INPUT * n)()
+    for inp, (vk, flags) in zip(arr, events):
+        inp.type = INPUT_KEYBOARD
+        inp.union.ki.wVk = vk
+        inp.union.ki.dwFlags = flags | (
+            KEYEVENTF_EXTENDEDKEY if (_EXTENDED_MASK >> vk) & 1 else 0)
+    return arr, n
+
+
+# action_id -> (INPUT array, count), built once at import.  ACTIONS is
+# treated as read-only.
+_ACTION_INPUTS = {
+    aid: _precompile(a["keys"]) for aid, a in ACTIONS.items() if a["keys"]
+}
+
+
 def execute_action(action_id):
     """Execute a named action by sending the associated key combo."""
-    action = ACTIONS.get(action_id)
-    if not action or not action["keys"]:
-        return
-    send_key_combo(action["keys"])
+    entry = _ACTION_INPUTS.get(action_id)
+    if entry:
+        SendInput(entry[1], entry[0], _INPUT_SIZE)
+
+
+def _noop():
+    pass
+
+
+def compile_action(action_id):
+    """Return a callable that performs *action_id* with one SendInput call
+    on its precompiled INPUT array.  Unknown and key-less actions compile
+    to a no-op.
+    """
+    entry = _ACTION_INPUTS.get(action_id)
+    if not entry:
+        return _noop
+    arr, n = entry
+
+    def run():
+        SendInput(n, arr, _INPUT_SIZE)
+    return run
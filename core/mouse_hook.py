@@ -4,7 +4,9 @@ Intercepts mouse button presses and horizontal scroll events
 so we can remap them before they reach applications.
 """
 
+import collections
 import ctypes
+import struct
 import ctypes.wintypes as wintypes
 import threading
 import time
@@ -18,6 +20,7 @@ except Exception:              # ImportError or hidapi missing
 
 # Windows constants
 WH_MOUSE_LL = 14
+WM_MOUSEMOVE = 0x0200
 WM_XBUTTONDOWN = 0x020B
 WM_XBUTTONUP = 0x020C
 WM_MBUTTONDOWN = 0x0207
@@ -37,7 +40,7 @@ class MSLLHOOKSTRUCT(Structure):
         ("mouseData", wintypes.DWORD),
         ("flags", wintypes.DWORD),
         ("time", wintypes.DWORD),
-        ("dwExtraInfo", ctypes.POINTER(ctypes.c_ulong)),
+        ("dwExtraInfo", ctypes.c_size_t),   # ULONG_PTR — a value, not a pointer
     ]
 
 # Hook procedure type
@@ -64,19 +67,36 @@ GetMessageW = windll.user32.GetMessageW
 PostThreadMessageW = windll.user32.PostThreadMessageW
 
 WM_QUIT = 0x0012
+WM_APP = 0x8000
+WM_APP_REHOOK = WM_APP + 1   # hook thread: reinstall with current debug mode
 
 # Injected flag — events we synthesize ourselves carry this
 INJECTED_FLAG = 0x00000001
 
 # ── Raw Input constants ───────────────────────────────────────────
-WM_INPUT = 0x00FF
 RIDEV_INPUTSINK = 0x00000100
-RID_INPUT = 0x10000003
+RIDEV_DEVNOTIFY = 0x00002000   # deliver WM_INPUT_DEVICE_CHANGE
+WM_INPUT_DEVICE_CHANGE = 0x00FE
+WM_INPUT = 0x00FF
+# PeekMessage ranges covering every message except WM_INPUT, which is left
+# queued for GetRawInputBuffer — dispatching one to DefWindowProcW frees
+# its data unread
+_NON_INPUT_RANGES = ((0, WM_INPUT - 1), (WM_INPUT + 1, 0xFFFFFFFF))
+GIDC_ARRIVAL = 1
+GIDC_REMOVAL = 2
+_HANDLE_MASK = (1 << (8 * sizeof(c_void_p))) - 1   # LPARAM -> unsigned handle
+RI_BATCH_SIZE = 65536   # bytes — GetRawInputBuffer batch buffer
+# NEXTRAWINPUTBLOCK alignment (QWORD on 64-bit, DWORD on 32-bit)
+RAWINPUT_ALIGN = sizeof(c_void_p)
+QS_ALLINPUT = 0x04FF
+MWMO_INPUTAVAILABLE = 0x0004   # wake for queued input already peeked at
+PM_REMOVE = 0x0001
+INFINITE = 0xFFFFFFFF
 RIM_TYPEMOUSE = 0
 RIM_TYPEKEYBOARD = 1
 RIM_TYPEHID = 2
 RIDI_DEVICENAME = 0x20000007
-SW_HIDE = 0
+HWND_MESSAGE = -3  # parent for message-only windows
 
 # Standard mouse buttons that the LL hook already handles (bits 0-4)
 STANDARD_BUTTON_MASK = 0x1F
@@ -96,7 +116,7 @@ class RAWINPUTHEADER(Structure):
         ("dwType", c_ulong),
         ("dwSize", c_ulong),
         ("hDevice", c_void_p),
-        ("wParam", POINTER(c_ulong)),
+        ("wParam", wintypes.WPARAM),
     ]
 
 class RAWMOUSE(Structure):
@@ -110,11 +130,12 @@ class RAWMOUSE(Structure):
         ("ulExtraInformation", c_ulong),
     ]
 
-class RAWHID(Structure):
-    _fields_ = [
-        ("dwSizeHid", c_ulong),
-        ("dwCount", c_ulong),
-    ]
+# Field readers for the Raw Input batch buffer: one C-level unpack
+# instead of a ctypes view object plus per-field descriptor calls.
+# Native alignment ("@") matches RAWINPUTHEADER's layout.
+_RI_HEADER = struct.Struct("@IIP")   # dwType, dwSize, hDevice
+_RI_RAW_BUTTONS = struct.Struct("@I")
+_RAW_BUTTONS_OFFSET = RAWMOUSE.ulRawButtons.offset
 
 WNDPROC_TYPE = CFUNCTYPE(ctypes.c_longlong, wintypes.HWND, c_uint,
                           wintypes.WPARAM, wintypes.LPARAM)
@@ -135,12 +156,51 @@ class WNDCLASSEXW(Structure):
         ("hIconSm", wintypes.HICON),
     ]
 
+# Collections registered for Raw Input, most important first so that a
+# failed registration can retry with a shorter prefix of the same array
+_RID_USAGES = (
+    (0x01, 0x02),      # All mice — to read ulRawButtons for higher button bits
+    (0xFF43, 0x0202),  # Logitech HID++ short reports
+    (0xFF43, 0x0204),  # Logitech HID++ long reports
+    (0x0C, 0x01),      # Consumer Controls (some firmware maps gesture here)
+)
+# (count, description) tried in order by _setup_raw_input
+_RID_FALLBACKS = (
+    (4, "mice + Logitech HID + consumer"),
+    (2, "mice + Logitech HID short"),
+    (1, "mice only"),
+)
+
+
+def _make_rid_array(hwnd):
+    """Build the RAWINPUTDEVICE array for _RID_USAGES targeting *hwnd*."""
+    rid = (RAWINPUTDEVICE * len(_RID_USAGES))()
+    for entry, (page, usage) in zip(rid, _RID_USAGES):
+        entry.usUsagePage = page
+        entry.usUsage = usage
+        entry.dwFlags = RIDEV_INPUTSINK | RIDEV_DEVNOTIFY
+        entry.hwndTarget = hwnd
+    return rid
+
+
 # ── Win32 API — Raw Input ────────────────────────────────────────
 RegisterRawInputDevices = windll.user32.RegisterRawInputDevices
 
-GetRawInputData = windll.user32.GetRawInputData
-GetRawInputData.argtypes = [c_void_p, c_uint, c_void_p, POINTER(c_uint), c_uint]
-GetRawInputData.restype = c_uint
+GetRawInputBuffer = windll.user32.GetRawInputBuffer
+GetRawInputBuffer.argtypes = [c_void_p, POINTER(c_uint), c_uint]
+GetRawInputBuffer.restype = c_uint
+
+MsgWaitForMultipleObjectsEx = windll.user32.MsgWaitForMultipleObjectsEx
+MsgWaitForMultipleObjectsEx.argtypes = [
+    wintypes.DWORD, c_void_p, wintypes.DWORD, wintypes.DWORD, wintypes.DWORD,
+]
+MsgWaitForMultipleObjectsEx.restype = wintypes.DWORD
+
+PeekMessageW = windll.user32.PeekMessageW
+PeekMessageW.argtypes = [
+    POINTER(wintypes.MSG), wintypes.HWND, c_uint, c_uint, c_uint,
+]
+PeekMessageW.restype = wintypes.BOOL
 
 GetRawInputDeviceInfoW = windll.user32.GetRawInputDeviceInfoW
 RegisterClassExW = windll.user32.RegisterClassExW
@@ -153,8 +213,6 @@ CreateWindowExW.argtypes = [
     wintypes.HWND, wintypes.HMENU, wintypes.HINSTANCE, wintypes.LPVOID,
 ]
 
-ShowWindow = windll.user32.ShowWindow
-
 DefWindowProcW = windll.user32.DefWindowProcW
 DefWindowProcW.restype = ctypes.c_longlong
 DefWindowProcW.argtypes = [wintypes.HWND, c_uint, wintypes.WPARAM, wintypes.LPARAM]
@@ -172,18 +230,63 @@ def hiword(dword):
     return val
 
 
+# Event-type names as module globals, so the hook reads them with a single
+# global lookup instead of MouseEvent.<attr>.  Mirrored on MouseEvent below.
+_XBUTTON1_DOWN = "xbutton1_down"
+_XBUTTON1_UP = "xbutton1_up"
+_XBUTTON2_DOWN = "xbutton2_down"
+_XBUTTON2_UP = "xbutton2_up"
+_MIDDLE_DOWN = "middle_down"
+_MIDDLE_UP = "middle_up"
+_GESTURE_DOWN = "gesture_down"
+_GESTURE_UP = "gesture_up"
+_HSCROLL_LEFT = "hscroll_left"
+_HSCROLL_RIGHT = "hscroll_right"
+
+# One bit per event type — blocked events are kept as an int mask
+_EVENT_BITS = {
+    etype: 1 << i
+    for i, etype in enumerate((
+        _XBUTTON1_DOWN, _XBUTTON1_UP, _XBUTTON2_DOWN, _XBUTTON2_UP,
+        _MIDDLE_DOWN, _MIDDLE_UP, _GESTURE_DOWN, _GESTURE_UP,
+        _HSCROLL_LEFT, _HSCROLL_RIGHT,
+    ))
+}
+_BIT_HSCROLL_LEFT = _EVENT_BITS[_HSCROLL_LEFT]
+_BIT_HSCROLL_RIGHT = _EVENT_BITS[_HSCROLL_RIGHT]
+
+# (wParam, xbutton or 0) -> (event type, block bit) for the buttons we map
+_BUTTON_EVENTS = {
+    (WM_XBUTTONDOWN, XBUTTON1): (_XBUTTON1_DOWN, _EVENT_BITS[_XBUTTON1_DOWN]),
+    (WM_XBUTTONDOWN, XBUTTON2): (_XBUTTON2_DOWN, _EVENT_BITS[_XBUTTON2_DOWN]),
+    (WM_XBUTTONUP, XBUTTON1): (_XBUTTON1_UP, _EVENT_BITS[_XBUTTON1_UP]),
+    (WM_XBUTTONUP, XBUTTON2): (_XBUTTON2_UP, _EVENT_BITS[_XBUTTON2_UP]),
+    (WM_MBUTTONDOWN, 0): (_MIDDLE_DOWN, _EVENT_BITS[_MIDDLE_DOWN]),
+    (WM_MBUTTONUP, 0): (_MIDDLE_UP, _EVENT_BITS[_MIDDLE_UP]),
+}
+_XBUTTON_MSGS = frozenset((WM_XBUTTONDOWN, WM_XBUTTONUP))
+
+
 class MouseEvent:
-    """Represents a captured mouse event."""
-    XBUTTON1_DOWN = "xbutton1_down"
-    XBUTTON1_UP = "xbutton1_up"
-    XBUTTON2_DOWN = "xbutton2_down"
-    XBUTTON2_UP = "xbutton2_up"
-    MIDDLE_DOWN = "middle_down"
-    MIDDLE_UP = "middle_up"
-    GESTURE_DOWN = "gesture_down"      # MX Master 3S gesture button
-    GESTURE_UP = "gesture_up"           # (without Logi Options registers as middle-click)
-    HSCROLL_LEFT = "hscroll_left"
-    HSCROLL_RIGHT = "hscroll_right"
+    """Represents a captured mouse event.
+
+    The hook reuses one instance per event type (see ``_event``), so
+    callbacks must not hold on to an event after they return.  Pooled
+    events are not re-stamped: ``timestamp`` is when the instance was
+    created.
+    """
+    __slots__ = ("event_type", "raw_data", "timestamp")
+
+    XBUTTON1_DOWN = _XBUTTON1_DOWN
+    XBUTTON1_UP = _XBUTTON1_UP
+    XBUTTON2_DOWN = _XBUTTON2_DOWN
+    XBUTTON2_UP = _XBUTTON2_UP
+    MIDDLE_DOWN = _MIDDLE_DOWN
+    MIDDLE_UP = _MIDDLE_UP
+    GESTURE_DOWN = _GESTURE_DOWN       # MX Master 3S gesture button
+    GESTURE_UP = _GESTURE_UP           # (without Logi Options registers as middle-click)
+    HSCROLL_LEFT = _HSCROLL_LEFT
+    HSCROLL_RIGHT = _HSCROLL_RIGHT
 
     def __init__(self, event_type, raw_data=None):
         self.event_type = event_type
@@ -191,19 +294,31 @@ class MouseEvent:
         self.timestamp = time.time()
 
 
-# Custom messages for deferred scroll injection (avoids calling SendInput
-# from inside the low-level hook, which causes recursive deadlock / lag).
-WM_APP = 0x8000
-WM_APP_INJECT_VSCROLL = WM_APP + 1   # wParam = signed delta (as c_long)
-WM_APP_INJECT_HSCROLL = WM_APP + 2   # wParam = signed delta (as c_long)
+# One preallocated MouseEvent per event type, reused for every occurrence
+_EVENT_POOL = {
+    etype: MouseEvent(etype)
+    for etype in (
+        MouseEvent.XBUTTON1_DOWN, MouseEvent.XBUTTON1_UP,
+        MouseEvent.XBUTTON2_DOWN, MouseEvent.XBUTTON2_UP,
+        MouseEvent.MIDDLE_DOWN, MouseEvent.MIDDLE_UP,
+        MouseEvent.GESTURE_DOWN, MouseEvent.GESTURE_UP,
+        MouseEvent.HSCROLL_LEFT, MouseEvent.HSCROLL_RIGHT,
+    )
+}
 
-# Scroll injection via key_simulator (which has working SendInput + INPUT structs)
-from core.key_simulator import inject_scroll as _inject_scroll_impl
-from core.key_simulator import MOUSEEVENTF_WHEEL, MOUSEEVENTF_HWHEEL
 
-PostMessageW = windll.user32.PostMessageW
-PostMessageW.argtypes = [wintypes.HWND, c_uint, wintypes.WPARAM, wintypes.LPARAM]
-PostMessageW.restype = wintypes.BOOL
+def _event(event_type, raw_data=None):
+    """Return the pooled MouseEvent for *event_type*, refreshed in place."""
+    event = _EVENT_POOL[event_type]
+    event.raw_data = raw_data
+    return event
+
+
+# Scroll injection via key_simulator (which has working SendInput + INPUT structs).
+# Inverted scroll is injected from a worker thread, never from inside the
+# low-level hook, which causes recursive deadlock / lag.
+from core.key_simulator import inject_scroll_batch as _inject_scroll_batch
+from core.key_simulator import MOUSEEVENTF_WHEEL, MOUSEEVENTF_HWHEEL
 
 
 class MouseHook:
@@ -211,6 +326,19 @@ class MouseHook:
     Installs a low-level mouse hook on Windows to intercept
     side-button clicks and horizontal scroll events.
     """
+    # Every attribute the hook procedures touch is a slot, so self.* reads
+    # on the hot path skip the instance-dict probe.
+    __slots__ = (
+        "_hook", "_hook_thread", "_thread_id", "_running", "_callbacks",
+        "_blocked_mask", "_hook_proc", "_debug_callback", "_debug_mode",
+        "invert_vscroll", "invert_hscroll",
+        "_pending_vscroll", "_pending_hscroll", "_scroll_lock",
+        "_scroll_evt", "_scroll_thread",
+        "_ri_wndproc_ref", "_ri_hwnd", "_ri_thread", "_ri_thread_id",
+        "_ri_batch", "_ri_batch_cb", "_device_name_cache", "_ri_devices",
+        "_gesture_active", "_hid_gesture", "_hid_ready_cb",
+        "_event_q", "_doorbell", "_dispatch_thread", "_workers_running",
+    )
 
     def __init__(self):
         self._hook = None
@@ -218,49 +346,92 @@ class MouseHook:
         self._thread_id = None
         self._running = False
         self._callbacks = {}          # event_type -> list of callables
-        self._blocked_events = set()  # event types to block (consume)
+        self._blocked_mask = 0        # _EVENT_BITS of event types to block
         self._hook_proc = None        # prevent GC of the callback
         self._debug_callback = None   # callback for debug/detect mode
-        self.debug_mode = False       # when True, logs ALL mouse events
+        self._debug_mode = False      # see the debug_mode property
         # Scroll inversion settings (set by the engine from config)
         self.invert_vscroll = False
         self.invert_hscroll = False
         # Coalesced scroll injection state (accumulate deltas, inject once)
         self._pending_vscroll = 0     # accumulated inverted vertical delta
         self._pending_hscroll = 0     # accumulated inverted horizontal delta
-        self._vscroll_posted = False  # True if a WM_APP_INJECT_VSCROLL is in the queue
-        self._hscroll_posted = False  # True if a WM_APP_INJECT_HSCROLL is in the queue
+        self._scroll_lock = threading.Lock()  # guards the two pending deltas
+        self._scroll_evt = threading.Event()  # wakes the scroll worker
+        self._scroll_thread = None
         # Raw Input state for gesture button detection
-        self._ri_wndproc_ref = None   # prevent GC of window proc
+        self._ri_wndproc_ref = None   # WNDPROC wrapping DefWindowProcW
         self._ri_hwnd = None
+        self._ri_thread = None        # Raw Input has its own thread + pump
+        self._ri_thread_id = None
+        self._ri_batch = None         # GetRawInputBuffer batch buffer
+        self._ri_batch_cb = c_uint()  # its in/out size argument
         self._device_name_cache = {}
+        # hDevice -> [is_logitech, last ulRawButtons] — one lookup per packet
+        self._ri_devices = {}
         self._gesture_active = False  # central dedup flag for gesture
-        self._prev_raw_buttons = {}   # hDevice -> last ulRawButtons value
         # HID++ gesture listener (hidapi-based)
         self._hid_gesture = None
+        self._hid_ready_cb = None     # forwarded to HidGestureListener
+        # Callback dispatch runs on its own thread so the hook returns fast
+        self._event_q = collections.deque()  # (event_type, raw_data)
+        self._doorbell = threading.Event()
+        self._dispatch_thread = None
+        self._workers_running = False  # dispatch + scroll worker threads
 
     def register(self, event_type, callback):
         """Register a callback for a specific mouse event type."""
         self._callbacks.setdefault(event_type, []).append(callback)
 
+    def set_bindings(self, callbacks, blocked_events):
+        """Replace all callbacks and blocked events at once.  *callbacks*
+        maps event_type -> list of callables and is used as given, so the
+        caller must not mutate it afterwards."""
+        mask = 0
+        for event_type in blocked_events:
+            mask |= _EVENT_BITS.get(event_type, 0)
+        self._callbacks = callbacks
+        self._blocked_mask = mask
+
     def block(self, event_type):
         """Mark an event type to be blocked (not passed to other apps)."""
-        self._blocked_events.add(event_type)
+        self._blocked_mask |= _EVENT_BITS.get(event_type, 0)
 
     def unblock(self, event_type):
         """Allow an event type to pass through normally."""
-        self._blocked_events.discard(event_type)
+        self._blocked_mask &= ~_EVENT_BITS.get(event_type, 0)
 
     def reset_bindings(self):
         """Clear all callbacks and blocked events without stopping the hook.
         Call this before re-registering bindings for a new profile."""
         self._callbacks.clear()
-        self._blocked_events.clear()
+        self._blocked_mask = 0
+
+    def set_hid_ready_callback(self, callback):
+        """Set ``callback(listener)``, run on the HID++ thread each time the
+        gesture listener (re)connects.  Takes effect on the next start()."""
+        self._hid_ready_cb = callback
 
     def set_debug_callback(self, callback):
         """Set a callback to receive ALL raw mouse events for detection."""
         self._debug_callback = callback
 
+    @property
+    def debug_mode(self):
+        """When True, reports ALL non-move mouse events to the debug callback."""
+        return self._debug_mode
+
+    @debug_mode.setter
+    def debug_mode(self, enabled):
+        enabled = bool(enabled)
+        if enabled == self._debug_mode:
+            return
+        self._debug_mode = enabled
+        # The hook proc is chosen at install time so the normal handler
+        # carries no debug checks; ask the hook thread to swap it.
+        if self._thread_id and self._hook:
+            PostThreadMessageW(self._thread_id, WM_APP_REHOOK, 0, 0)
+
     def _dispatch(self, event):
         """Fire all registered callbacks for this event type."""
         for cb in self._callbacks.get(event.event_type, []):
@@ -269,6 +440,38 @@ class MouseHook:
             except Exception as e:
                 print(f"[MouseHook] callback error: {e}")
 
+    def _post(self, event_type, raw_data=None):
+        """Queue an event for the dispatch thread.  Safe from any thread."""
+        self._event_q.append((event_type, raw_data))
+        self._doorbell.set()
+
+    def _dispatch_loop(self):
+        """Drain queued events and run their callbacks off the hook thread."""
+        q = self._event_q
+        while self._workers_running:
+            self._doorbell.wait()
+            self._doorbell.clear()
+            while q:
+                event_type, raw_data = q.popleft()
+                self._dispatch(_event(event_type, raw_data))
+
+    def _scroll_loop(self):
+        """Inject accumulated inverted scroll deltas, one per axis per wakeup,
+        in a single SendInput call."""
+        while self._workers_running:
+            self._scroll_evt.wait()
+            self._scroll_evt.clear()
+            with self._scroll_lock:
+                vdelta, self._pending_vscroll = self._pending_vscroll, 0
+                hdelta, self._pending_hscroll = self._pending_hscroll, 0
+            if vdelta and hdelta:
+                _inject_scroll_batch(((MOUSEEVENTF_WHEEL, vdelta),
+                                      (MOUSEEVENTF_HWHEEL, hdelta)))
+            elif vdelta:
+                _inject_scroll_batch(((MOUSEEVENTF_WHEEL, vdelta),))
+            elif hdelta:
+                _inject_scroll_batch(((MOUSEEVENTF_HWHEEL, hdelta),))
+
     # Map of WM_ constants to names for debug
     _WM_NAMES = {
         0x0200: "WM_MOUSEMOVE",
@@ -278,104 +481,103 @@ class MouseHook:
         0x020A: "WM_MOUSEWHEEL",  0x020B: "WM_XBUTTONDOWN",
         0x020C: "WM_XBUTTONUP",   0x020E: "WM_MOUSEHWHEEL",
     }
+    # Debug line template per message: the name is baked in once, only
+    # the numeric fields are formatted per event
+    _DEBUG_LINE = "  mouseData=0x%08X  hiword=%d  flags=0x%04X  extraInfo=0x%X"
+    _DEBUG_FMT = {}
+    for _wm, _name in _WM_NAMES.items():
+        _DEBUG_FMT[_wm] = _name + _DEBUG_LINE
+    del _wm, _name
 
     def _low_level_handler(self, nCode, wParam, lParam):
         """The actual hook procedure called by Windows."""
-        if nCode == HC_ACTION:
+        hook = self._hook
+        # Moves are the vast majority of hook calls and never remapped
+        if nCode != HC_ACTION or wParam == WM_MOUSEMOVE:
+            return CallNextHookEx(hook, nCode, wParam, lParam)
+
+        data = lParam.contents
+        mouse_data = data.mouseData
+        flags = data.flags
+        etype = None
+        bit = 0
+        raw_data = None
+
+        # Skip events we injected ourselves
+        if flags & INJECTED_FLAG:
+            return CallNextHookEx(hook, nCode, wParam, lParam)
+
+        if wParam == WM_MOUSEWHEEL:
+            # Vertical scroll inversion — coalesced injection
+            if self.invert_vscroll:
+                delta = hiword(mouse_data)
+                if delta != 0:
+                    with self._scroll_lock:
+                        self._pending_vscroll -= delta
+                    self._scroll_evt.set()
+                    return 1  # Block original
+
+        elif wParam == WM_MOUSEHWHEEL:
+            delta = hiword(mouse_data)
+            # Hardware-level inversion toggle — coalesced injection
+            if self.invert_hscroll:
+                if delta != 0:
+                    with self._scroll_lock:
+                        self._pending_hscroll -= delta
+                    self._scroll_evt.set()
+                    return 1  # Block original
+            # Action dispatch for mapped hscroll events
+            # MX Master 3S: positive delta = physical scroll right
+            if delta > 0:
+                etype = _HSCROLL_LEFT
+                bit = _BIT_HSCROLL_LEFT
+                raw_data = delta
+            elif delta < 0:
+                etype = _HSCROLL_RIGHT
+                bit = _BIT_HSCROLL_RIGHT
+                raw_data = -delta
+
+        else:
+            # Side / middle buttons: one table lookup
+            xbutton = hiword(mouse_data) if wParam in _XBUTTON_MSGS else 0
+            hit = _BUTTON_EVENTS.get((wParam, xbutton))
+            if hit:
+                etype, bit = hit
+
+        if etype:
+            # Blocking must be decided here; callbacks run on the
+            # dispatch thread so the hook returns immediately.
+            self._post(etype, raw_data)
+            if self._blocked_mask & bit:
+                return 1  # Block the event
+
+        return CallNextHookEx(hook, nCode, wParam, lParam)
+
+    def _low_level_handler_debug(self, nCode, wParam, lParam):
+        """Hook procedure used in debug mode: reports every non-move event
+        to the debug callback, then runs the normal handler."""
+        cb = self._debug_callback
+        if nCode == HC_ACTION and wParam != WM_MOUSEMOVE and cb:
             data = lParam.contents
             mouse_data = data.mouseData
-            flags = data.flags
-            event = None
-            should_block = False
-
-            # Debug mode: report every non-move event
-            if self.debug_mode and self._debug_callback:
-                wm_name = self._WM_NAMES.get(wParam, f"0x{wParam:04X}")
-                if wParam != 0x0200:  # skip mouse-move spam
-                    extra = data.dwExtraInfo.contents.value if data.dwExtraInfo else 0
-                    info = (f"{wm_name}  mouseData=0x{mouse_data:08X}  "
-                            f"hiword={hiword(mouse_data)}  flags=0x{flags:04X}  "
-                            f"extraInfo=0x{extra:X}")
-                    try:
-                        self._debug_callback(info)
-                    except Exception:
-                        pass
-
-            # Skip events we injected ourselves
-            if flags & INJECTED_FLAG:
-                return CallNextHookEx(self._hook, nCode, wParam, lParam)
-
-            if wParam == WM_XBUTTONDOWN:
-                xbutton = hiword(mouse_data)
-                if xbutton == XBUTTON1:
-                    event = MouseEvent(MouseEvent.XBUTTON1_DOWN)
-                    should_block = MouseEvent.XBUTTON1_DOWN in self._blocked_events
-                elif xbutton == XBUTTON2:
-                    event = MouseEvent(MouseEvent.XBUTTON2_DOWN)
-                    should_block = MouseEvent.XBUTTON2_DOWN in self._blocked_events
-
-            elif wParam == WM_XBUTTONUP:
-                xbutton = hiword(mouse_data)
-                if xbutton == XBUTTON1:
-                    event = MouseEvent(MouseEvent.XBUTTON1_UP)
-                    should_block = MouseEvent.XBUTTON1_UP in self._blocked_events
-                elif xbutton == XBUTTON2:
-                    event = MouseEvent(MouseEvent.XBUTTON2_UP)
-                    should_block = MouseEvent.XBUTTON2_UP in self._blocked_events
-
-            elif wParam == WM_MBUTTONDOWN:
-                event = MouseEvent(MouseEvent.MIDDLE_DOWN)
-                should_block = MouseEvent.MIDDLE_DOWN in self._blocked_events
-
-            elif wParam == WM_MBUTTONUP:
-                event = MouseEvent(MouseEvent.MIDDLE_UP)
-                should_block = MouseEvent.MIDDLE_UP in self._blocked_events
-
-            elif wParam == WM_MOUSEWHEEL:
-                # Vertical scroll inversion — coalesced injection
-                if self.invert_vscroll:
-                    delta = hiword(mouse_data)
-                    if delta != 0:
-                        self._pending_vscroll += (-delta)
-                        if not self._vscroll_posted and self._ri_hwnd:
-                            self._vscroll_posted = True
-                            PostMessageW(self._ri_hwnd,
-                                         WM_APP_INJECT_VSCROLL, 0, 0)
-                        return 1  # Block original
-
-            elif wParam == WM_MOUSEHWHEEL:
-                delta = hiword(mouse_data)
-                # Hardware-level inversion toggle — coalesced injection
-                if self.invert_hscroll:
-                    if delta != 0:
-                        self._pending_hscroll += (-delta)
-                        if not self._hscroll_posted and self._ri_hwnd:
-                            self._hscroll_posted = True
-                            PostMessageW(self._ri_hwnd,
-                                         WM_APP_INJECT_HSCROLL, 0, 0)
-                        return 1  # Block original
-                # Action dispatch for mapped hscroll events
-                # MX Master 3S: positive delta = physical scroll right
-                if delta > 0:
-                    event = MouseEvent(MouseEvent.HSCROLL_LEFT, abs(delta))
-                    should_block = MouseEvent.HSCROLL_LEFT in self._blocked_events
-                elif delta < 0:
-                    event = MouseEvent(MouseEvent.HSCROLL_RIGHT, abs(delta))
-                    should_block = MouseEvent.HSCROLL_RIGHT in self._blocked_events
-
-            if event:
-                self._dispatch(event)
-                if should_block:
-                    return 1  # Block the event
-
-        return CallNextHookEx(self._hook, nCode, wParam, lParam)
+            fmt = self._DEBUG_FMT.get(wParam)
+            if fmt is None:
+                fmt = "0x%04X" % wParam + self._DEBUG_LINE
+            info = fmt % (mouse_data, hiword(mouse_data), data.flags,
+                          data.dwExtraInfo)
+            try:
+                cb(info)
+            except Exception:
+                pass
+        return self._low_level_handler(nCode, wParam, lParam)
 
     # ── Raw Input: device identification ──────────────────────────
 
     def _get_device_name(self, hDevice):
         """Get the device path for a Raw Input device handle."""
-        if hDevice in self._device_name_cache:
-            return self._device_name_cache[hDevice]
+        name = self._device_name_cache.get(hDevice)
+        if name is not None:
+            return name
         try:
             sz = c_uint(0)
             GetRawInputDeviceInfoW(hDevice, RIDI_DEVICENAME, None, byref(sz))
@@ -393,91 +595,94 @@ class MouseHook:
     def _is_logitech(self, hDevice):
         return "046d" in self._get_device_name(hDevice).lower()
 
-    # ── Raw Input: gesture detection ──────────────────────────────
-
-    def _ri_wndproc(self, hwnd, msg, wParam, lParam):
-        """Window procedure that receives Raw Input messages and
-        deferred scroll-injection requests."""
-        if msg == WM_INPUT:
-            try:
-                self._process_raw_input(lParam)
-            except Exception as e:
-                print(f"[MouseHook] Raw Input error: {e}")
-            return 0
-
-        if msg == WM_APP_INJECT_VSCROLL:
-            delta = self._pending_vscroll
-            self._pending_vscroll = 0
-            self._vscroll_posted = False
-            if delta != 0:
-                _inject_scroll_impl(MOUSEEVENTF_WHEEL, delta)
-            return 0
-
-        if msg == WM_APP_INJECT_HSCROLL:
-            delta = self._pending_hscroll
-            self._pending_hscroll = 0
-            self._hscroll_posted = False
-            if delta != 0:
-                _inject_scroll_impl(MOUSEEVENTF_HWHEEL, delta)
-            return 0
-
-        return DefWindowProcW(hwnd, msg, wParam, lParam)
-
-    def _process_raw_input(self, lParam):
-        """Parse a WM_INPUT message and detect gesture button."""
-        sz = c_uint(0)
-        GetRawInputData(lParam, RID_INPUT, None, byref(sz),
-                        sizeof(RAWINPUTHEADER))
-        if sz.value == 0:
-            return
-
-        buf = create_string_buffer(sz.value)
-        ret = GetRawInputData(lParam, RID_INPUT, buf, byref(sz),
-                              sizeof(RAWINPUTHEADER))
-        if ret == 0xFFFFFFFF:
-            return
+    def _on_device_change(self, change, hDevice):
+        """WM_INPUT_DEVICE_CHANGE: identify a device once when it arrives
+        and forget it when it leaves, so a reused handle never hits stale
+        cache entries.  Runs on the Raw Input thread."""
+        if change == GIDC_REMOVAL:
+            self._device_name_cache.pop(hDevice, None)
+            self._ri_devices.pop(hDevice, None)
+        elif change == GIDC_ARRIVAL:
+            self._device_name_cache.pop(hDevice, None)
+            self._ri_devices[hDevice] = [self._is_logitech(hDevice), 0]
 
-        header = RAWINPUTHEADER.from_buffer_copy(buf)
+    # ── Raw Input: gesture detection ──────────────────────────────
 
-        if not self._is_logitech(header.hDevice):
+    def _drain_raw_input(self):
+        """Read every pending Raw Input record in batches with
+        GetRawInputBuffer and detect the gesture button.  Returns False
+        if the buffer read failed."""
+        buf = self._ri_batch
+        hdr_size = sizeof(RAWINPUTHEADER)
+        btn_off = hdr_size + _RAW_BUTTONS_OFFSET
+        unpack_header = _RI_HEADER.unpack_from
+        unpack_buttons = _RI_RAW_BUTTONS.unpack_from
+        cb = self._ri_batch_cb
+        cb_ref = byref(cb)
+        devices = self._ri_devices
+        while True:
+            cb.value = RI_BATCH_SIZE
+            count = GetRawInputBuffer(buf, cb_ref, hdr_size)
+            if count == 0:
+                return True
+            if count == 0xFFFFFFFF:
+                return False
+            offset = 0
+            for _ in range(count):
+                # Read fields straight out of the batch buffer — only
+                # valid until the next GetRawInputBuffer call
+                dw_type, dw_size, h = unpack_header(buf, offset)
+                if dw_type == RIM_TYPEMOUSE:
+                    dev = devices.get(h)
+                    if dev is None:
+                        dev = devices[h] = [self._is_logitech(h), 0]
+                    if dev[0]:
+                        self._check_raw_mouse_gesture(
+                            dev, unpack_buttons(buf, offset + btn_off)[0])
+                # NEXTRAWINPUTBLOCK
+                offset = ((offset + dw_size + RAWINPUT_ALIGN - 1)
+                          & ~(RAWINPUT_ALIGN - 1))
+
+    def _check_raw_mouse_gesture(self, dev, raw_btns):
+        """Detect gesture button via extra button bits in ulRawButtons.
+        *dev* is the device's ``_ri_devices`` entry."""
+        prev_btns = dev[1]
+
+        # Only look at buttons beyond the standard 5 (bits 5+).  Almost
+        # every packet leaves them untouched, so bail out on one XOR.
+        # Only extra bits are ever compared, so prev needn't be refreshed.
+        if not (raw_btns ^ prev_btns) & ~STANDARD_BUTTON_MASK:
             return
+        dev[1] = raw_btns
 
-        if header.dwType == RIM_TYPEMOUSE:
-            self._check_raw_mouse_gesture(header.hDevice, buf)
-
-    def _check_raw_mouse_gesture(self, hDevice, buf):
-        """Detect gesture button via extra button bits in ulRawButtons."""
-        mouse = RAWMOUSE.from_buffer_copy(buf, sizeof(RAWINPUTHEADER))
-        raw_btns = mouse.ulRawButtons
-        prev_btns = self._prev_raw_buttons.get(hDevice, 0)
-        self._prev_raw_buttons[hDevice] = raw_btns
-
-        # Only look at buttons beyond the standard 5 (bits 5+)
         extra_now = raw_btns & ~STANDARD_BUTTON_MASK
         extra_prev = prev_btns & ~STANDARD_BUTTON_MASK
 
-        if extra_now == extra_prev:
-            return
-
+        # No printing here: this runs on the Raw Input thread, and a
+        # blocked console write would stall input.  The extra bits ride
+        # along as raw_data for anyone who wants to log them.
         if extra_now and not extra_prev:
             if not self._gesture_active:
                 self._gesture_active = True
-                print(f"[MouseHook] Gesture DOWN (rawBtns extra: 0x{extra_now:X})")
-                self._dispatch(MouseEvent(MouseEvent.GESTURE_DOWN))
+                self._post(MouseEvent.GESTURE_DOWN, extra_now)
         elif not extra_now and extra_prev:
             if self._gesture_active:
                 self._gesture_active = False
-                print("[MouseHook] Gesture UP")
-                self._dispatch(MouseEvent(MouseEvent.GESTURE_UP))
+                self._post(MouseEvent.GESTURE_UP)
 
     # ── Raw Input: setup ──────────────────────────────────────────
 
     def _setup_raw_input(self):
-        """Create hidden window and register for Raw Input on the hook thread."""
+        """Create a message-only window and register for Raw Input on the
+        Raw Input thread."""
         hInst = GetModuleHandleW(None)
         cls_name = f"LogiControlRawInput_{id(self)}"
 
-        self._ri_wndproc_ref = WNDPROC_TYPE(self._ri_wndproc)
+        # The window never needs Python-side handling: Raw Input is read in
+        # batches by _drain_raw_input, and every message goes to
+        # DefWindowProcW in C without entering the interpreter.
+        self._ri_wndproc_ref = WNDPROC_TYPE(
+            ctypes.cast(DefWindowProcW, c_void_p).value)
 
         wc = WNDCLASSEXW()
         wc.cbSize = sizeof(WNDCLASSEXW)
@@ -493,98 +698,112 @@ class MouseHook:
         self._ri_hwnd = CreateWindowExW(
             0, cls_name, "LogiControl RI", 0,
             0, 0, 1, 1,
-            None, None, hInst, None,
+            HWND_MESSAGE, None, hInst, None,
         )
         if not self._ri_hwnd:
             print("[MouseHook] CreateWindowExW failed — gesture detection unavailable")
             return False
 
-        ShowWindow(self._ri_hwnd, SW_HIDE)
-
-        # Register for Raw Input collections
-        rid = (RAWINPUTDEVICE * 4)()
-
-        # 0: All mice — to read ulRawButtons for higher button bits
-        rid[0].usUsagePage = 0x01
-        rid[0].usUsage = 0x02
-        rid[0].dwFlags = RIDEV_INPUTSINK
-        rid[0].hwndTarget = self._ri_hwnd
-
-        # 1: Logitech HID++ short reports
-        rid[1].usUsagePage = 0xFF43
-        rid[1].usUsage = 0x0202
-        rid[1].dwFlags = RIDEV_INPUTSINK
-        rid[1].hwndTarget = self._ri_hwnd
-
-        # 2: Logitech HID++ long reports
-        rid[2].usUsagePage = 0xFF43
-        rid[2].usUsage = 0x0204
-        rid[2].dwFlags = RIDEV_INPUTSINK
-        rid[2].hwndTarget = self._ri_hwnd
-
-        # 3: Consumer Controls (some firmware maps gesture here)
-        rid[3].usUsagePage = 0x0C
-        rid[3].usUsage = 0x01
-        rid[3].dwFlags = RIDEV_INPUTSINK
-        rid[3].hwndTarget = self._ri_hwnd
-
-        ok = RegisterRawInputDevices(rid, 4, sizeof(RAWINPUTDEVICE))
-        if ok:
-            print("[MouseHook] Raw Input: mice + Logitech HID + consumer")
-            return True
-
-        # Fallback: mice + one vendor collection
-        ok2 = RegisterRawInputDevices(rid, 2, sizeof(RAWINPUTDEVICE))
-        if ok2:
-            print("[MouseHook] Raw Input: mice + Logitech HID short")
-            return True
-
-        # Fallback: mice only
-        ok3 = RegisterRawInputDevices(rid, 1, sizeof(RAWINPUTDEVICE))
-        if ok3:
-            print("[MouseHook] Raw Input: mice only")
-            return True
+        # Register for Raw Input collections.  Registration is all-or-nothing,
+        # so a failed attempt leaves nothing behind and each fallback simply
+        # retries with a shorter prefix of the same array.
+        rid = _make_rid_array(self._ri_hwnd)
+        for count, what in _RID_FALLBACKS:
+            if RegisterRawInputDevices(rid, count, sizeof(RAWINPUTDEVICE)):
+                print(f"[MouseHook] Raw Input: {what}")
+                return True
+            print(f"[MouseHook] Raw Input registration ({what}) failed, "
+                  f"error {ctypes.GetLastError()}")
 
         print("[MouseHook] Raw Input registration failed")
         return False
 
-    def _run_hook(self):
-        """Run the message loop on a dedicated thread."""
-        self._thread_id = windll.kernel32.GetCurrentThreadId()
+    def _run_raw_input(self):
+        """Own the Raw Input window and read its input in batches, so raw
+        mouse traffic never competes with the low-level hook's time budget.
+        Sleeps in MsgWaitForMultipleObjectsEx until input or a message
+        (e.g. WM_QUIT from stop()) arrives."""
+        self._ri_thread_id = windll.kernel32.GetCurrentThreadId()
+        if self._setup_raw_input():
+            # Allocated once and kept across stop()/start()
+            if self._ri_batch is None:
+                self._ri_batch = create_string_buffer(RI_BATCH_SIZE)
+            msg = wintypes.MSG()
+            running = True
+            while running:
+                try:
+                    drained = self._drain_raw_input()
+                except Exception as e:
+                    print(f"[MouseHook] Raw Input error: {e}")
+                    drained = False
+                # Flush the other messages.  WM_INPUT that arrived after the
+                # drain stays queued for the next one; only if the buffer
+                # read failed is it handed to DefWindowProcW for cleanup,
+                # so the wait below can't spin on it.
+                ranges = _NON_INPUT_RANGES if drained else ((0, 0),)
+                for lo, hi in ranges:
+                    while PeekMessageW(ctypes.byref(msg), None, lo, hi,
+                                       PM_REMOVE):
+                        if msg.message == WM_QUIT:
+                            running = False
+                            break
+                        if msg.message == WM_INPUT_DEVICE_CHANGE:
+                            self._on_device_change(
+                                msg.wParam, msg.lParam & _HANDLE_MASK)
+                        DispatchMessageW(ctypes.byref(msg))
+                    if not running:
+                        break
+                if running:
+                    MsgWaitForMultipleObjectsEx(0, None, INFINITE,
+                                                QS_ALLINPUT,
+                                                MWMO_INPUTAVAILABLE)
+        if self._ri_hwnd:
+            DestroyWindow(self._ri_hwnd)
+            self._ri_hwnd = None
 
+    def _install_hook(self):
+        """(Re)install the LL hook with the handler for the current debug
+        mode.  Must run on the hook thread."""
+        handler = (self._low_level_handler_debug if self._debug_mode
+                   else self._low_level_handler)
         # IMPORTANT: must keep reference alive so GC doesn't collect it
-        self._hook_proc = HOOKPROC(self._low_level_handler)
+        proc = HOOKPROC(handler)
+        hook = SetWindowsHookExW(WH_MOUSE_LL, proc, GetModuleHandleW(None), 0)
+        if not hook:
+            return False
+        old_hook, old_proc = self._hook, self._hook_proc
+        self._hook, self._hook_proc = hook, proc
+        if old_hook:
+            UnhookWindowsHookEx(old_hook)
+        del old_proc  # safe to release only once unhooked
+        return True
 
-        self._hook = SetWindowsHookExW(
-            WH_MOUSE_LL,
-            self._hook_proc,
-            GetModuleHandleW(None),
-            0,
-        )
-        if not self._hook:
+    def _run_hook(self):
+        """Run the low-level hook's message loop on a dedicated thread."""
+        self._thread_id = windll.kernel32.GetCurrentThreadId()
+
+        if not self._install_hook():
             print("[MouseHook] Failed to install hook!")
             return
 
         print("[MouseHook] Hook installed successfully")
 
-        # Set up Raw Input for gesture button detection
-        self._setup_raw_input()
-
         self._running = True
 
-        # Message pump — required for low-level hooks AND Raw Input
+        # Message pump — required for low-level hooks
         msg = wintypes.MSG()
-        while self._running:
+        while True:
             result = GetMessageW(ctypes.byref(msg), None, 0, 0)
             if result == 0 or result == -1:
                 break
+            if msg.message == WM_APP_REHOOK:
+                if not self._install_hook():
+                    print("[MouseHook] Failed to reinstall hook")
+                continue
             TranslateMessage(ctypes.byref(msg))
             DispatchMessageW(ctypes.byref(msg))
 
         # Cleanup
-        if self._ri_hwnd:
-            DestroyWindow(self._ri_hwnd)
-            self._ri_hwnd = None
         if self._hook:
             UnhookWindowsHookEx(self._hook)
             self._hook = None
@@ -596,29 +815,42 @@ class MouseHook:
         """Called from HidGestureListener thread on button press."""
         if not self._gesture_active:
             self._gesture_active = True
-            self._dispatch(MouseEvent(MouseEvent.GESTURE_DOWN))
+            self._post(MouseEvent.GESTURE_DOWN)
 
     def _on_hid_gesture_up(self):
         """Called from HidGestureListener thread on button release."""
         if self._gesture_active:
             self._gesture_active = False
-            self._dispatch(MouseEvent(MouseEvent.GESTURE_UP))
+            self._post(MouseEvent.GESTURE_UP)
 
     def start(self):
         """Start the mouse hook on a background thread."""
         if self._hook_thread and self._hook_thread.is_alive():
             return
 
+        self._workers_running = True
+        self._dispatch_thread = threading.Thread(
+            target=self._dispatch_loop, daemon=True, name="MouseHookDispatch")
+        self._dispatch_thread.start()
+        self._scroll_thread = threading.Thread(
+            target=self._scroll_loop, daemon=True, name="MouseHookScroll")
+        self._scroll_thread.start()
+
         # Start HID++ gesture listener (primary path for BT gesture button)
         if HidGestureListener is not None:
             self._hid_gesture = HidGestureListener(
                 on_down=self._on_hid_gesture_down,
                 on_up=self._on_hid_gesture_up,
+                on_ready=self._hid_ready_cb,
             )
             self._hid_gesture.start()
 
         self._hook_thread = threading.Thread(target=self._run_hook, daemon=True)
         self._hook_thread.start()
+        # Raw Input for gesture button detection, on its own thread
+        self._ri_thread = threading.Thread(
+            target=self._run_raw_input, daemon=True, name="MouseHookRawInput")
+        self._ri_thread.start()
         # Give it a moment to install
         time.sleep(0.1)
 
@@ -629,10 +861,26 @@ class MouseHook:
         if self._hid_gesture:
             self._hid_gesture.stop()
             self._hid_gesture = None
-        if self._thread_id:
-            PostThreadMessageW(self._thread_id, WM_QUIT, 0, 0)
-        if self._hook_thread:
-            self._hook_thread.join(timeout=2)
+        for tid in (self._thread_id, self._ri_thread_id):
+            if tid:
+                PostThreadMessageW(tid, WM_QUIT, 0, 0)
+        for t in (self._hook_thread, self._ri_thread):
+            if t:
+                t.join(timeout=2)
+        self._workers_running = False
+        self._doorbell.set()
+        self._scroll_evt.set()
+        for t in (self._dispatch_thread, self._scroll_thread):
+            if t:
+                t.join(timeout=2)
+        self._dispatch_thread = None
+        self._scroll_thread = None
+        self._event_q.clear()
         self._hook = None
         self._ri_hwnd = None
         self._thread_id = None
+        self._ri_thread = None
+        self._ri_thread_id = None
+        # Device handles may be reused after a restart
+        self._device_name_cache.clear()
+        self._ri_devices.clear()
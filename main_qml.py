@@ -8,51 +8,58 @@ Run with:   python main_qml.py
 
 import sys
 import os
+import importlib.util
 
-# Ensure project root on path
+# Project root (run as a script, so it is already sys.path[0])
 ROOT = os.path.dirname(os.path.abspath(__file__))
-sys.path.insert(0, ROOT)
 
 # Set Material theme before any Qt imports
 os.environ["QT_QUICK_CONTROLS_STYLE"] = "Material"
 os.environ["QT_QUICK_CONTROLS_MATERIAL_THEME"] = "Dark"
 os.environ["QT_QUICK_CONTROLS_MATERIAL_ACCENT"] = "#00d4aa"
 
-from PySide6.QtWidgets import QApplication, QSystemTrayIcon, QMenu
-from PySide6.QtGui import QIcon, QAction
-from PySide6.QtCore import Qt, QUrl, QCoreApplication
-from PySide6.QtQml import QQmlApplicationEngine
-
-# Ensure PySide6 QML plugins are found
-import PySide6
-_pyside_dir = os.path.dirname(PySide6.__file__)
-os.environ.setdefault("QML2_IMPORT_PATH", os.path.join(_pyside_dir, "qml"))
-os.environ.setdefault("QT_PLUGIN_PATH", os.path.join(_pyside_dir, "plugins"))
+# Ensure PySide6 QML plugins are found.  find_spec locates the package
+# without importing it, so Qt stays unloaded until main() needs it.
+_pyside_spec = importlib.util.find_spec("PySide6")
+if _pyside_spec and _pyside_spec.submodule_search_locations:
+    _pyside_dir = list(_pyside_spec.submodule_search_locations)[0]
+    os.environ.setdefault("QML2_IMPORT_PATH", os.path.join(_pyside_dir, "qml"))
+    os.environ.setdefault("QT_PLUGIN_PATH", os.path.join(_pyside_dir, "plugins"))
 
 from core.engine import Engine
-from ui.backend import Backend
 
 
-def _app_icon() -> QIcon:
+def _app_icon():
     """Load the app icon from the pre-cropped .ico file."""
+    from PySide6.QtGui import QIcon
     ico = os.path.join(ROOT, "images", "logo.ico")
     return QIcon(ico)
 
 
 def main():
-    QCoreApplication.setAttribute(Qt.ApplicationAttribute.AA_ShareOpenGLContexts)
-    app = QApplication(sys.argv)
-    app.setApplicationName("LogiControl")
-    app.setOrganizationName("LogiControl")
-    app.setWindowIcon(_app_icon())
-
     # ── Engine ─────────────────────────────────────────────────
+    # Started before Qt is even imported, so remapping is live while
+    # the (much slower) UI stack loads.
     engine = Engine()
     engine.start()
     print("[LogiControl] Engine started — remapping is active")
 
+    from PySide6.QtWidgets import QApplication, QSystemTrayIcon, QMenu
+    from PySide6.QtGui import QAction
+    from PySide6.QtCore import Qt, QUrl, QCoreApplication
+    from PySide6.QtQml import QQmlApplicationEngine
+    from ui.backend import Backend
+
+    QCoreApplication.setAttribute(Qt.ApplicationAttribute.AA_ShareOpenGLContexts)
+    app = QApplication(sys.argv)
+    app.setApplicationName("LogiControl")
+    app.setOrganizationName("LogiControl")
+    icon = _app_icon()
+    app.setWindowIcon(icon)
+
     # ── QML Backend ────────────────────────────────────────────
     backend = Backend(engine)
+    app.aboutToQuit.connect(backend.shutdown)
 
     # ── QML Engine ─────────────────────────────────────────────
     qml_engine = QQmlApplicationEngine()
@@ -70,7 +77,7 @@ def main():
     root_window = qml_engine.rootObjects()[0]
 
     # ── System Tray ────────────────────────────────────────────
-    tray = QSystemTrayIcon(_app_icon(), app)
+    tray = QSystemTrayIcon(icon, app)
     tray.setToolTip("LogiControl — MX Master 3S")
 
     tray_menu = QMenu()
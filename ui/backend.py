@@ -3,19 +3,96 @@ QML Backend Bridge — connects the QML UI to the engine and config.
 Exposes properties, signals, and slots for two-way data binding.
 """
 
+import copy
 import os
+from concurrent.futures import ThreadPoolExecutor
 
-from PySide6.QtCore import QObject, Property, Signal, Slot, Qt
+from PySide6.QtCore import (
+    QObject, Property, Signal, Slot, Qt, QTimer, QMetaObject, Q_ARG,
+)
 
 from core.config import (
     BUTTON_NAMES, load_config, save_config, get_active_mappings,
     set_mapping, create_profile, delete_profile, KNOWN_APPS, get_icon_for_exe,
+    find_profile_for_app,
 )
 from core.key_simulator import ACTIONS
 
+# Set BACKEND_PROFILE=1 to profile the GUI thread (property reads, slots)
+# and write backend.cprofile on exit — open it with snakeviz/pstats.
+if os.environ.get("BACKEND_PROFILE"):
+    import atexit
+    import cProfile
+
+    _prof = cProfile.Profile()
+    _prof.enable()
+
+    def _dump_profile():
+        _prof.disable()
+        _prof.dump_stats("backend.cprofile")
+        print("[Backend] Profile written to backend.cprofile")
+
+    atexit.register(_dump_profile)
+
+
+_ACTION_LABELS = {aid: data.get("label", "Do Nothing")
+                  for aid, data in ACTIONS.items()}
+
 
 def _action_label(action_id):
-    return ACTIONS.get(action_id, {}).get("label", "Do Nothing")
+    return _ACTION_LABELS.get(action_id, "Do Nothing")
+
+
+def _build_action_categories():
+    """Actions grouped by category, "Other" first, labels sorted."""
+    cats = {}
+    for aid in sorted(
+        ACTIONS,
+        key=lambda a: (
+            "0" if ACTIONS[a]["category"] == "Other" else "1" + ACTIONS[a]["category"],
+            ACTIONS[a]["label"],
+        ),
+    ):
+        data = ACTIONS[aid]
+        cats.setdefault(data["category"], []).append(
+            {"id": aid, "label": data["label"]})
+    return [{"category": c, "actions": a} for c, a in cats.items()]
+
+
+def _build_all_actions():
+    """Flat action list sorted by category/label, "Do Nothing" first."""
+    result = []
+    none_data = ACTIONS.get("none")
+    if none_data:
+        result.append({"id": "none", "label": none_data["label"],
+                       "category": "Other"})
+    for aid in sorted(
+        ACTIONS,
+        key=lambda a: (ACTIONS[a]["category"], ACTIONS[a]["label"]),
+    ):
+        if aid == "none":
+            continue
+        data = ACTIONS[aid]
+        result.append({"id": aid, "label": data["label"],
+                       "category": data["category"]})
+    return result
+
+
+# ACTIONS and KNOWN_APPS are fixed at import, so these lists are built once.
+_ACTION_CATEGORIES = _build_action_categories()
+_ALL_ACTIONS = _build_all_actions()
+_KNOWN_APPS_LIST = [
+    {"exe": ex, "label": info["label"], "icon": get_icon_for_exe(ex)}
+    for ex, info in KNOWN_APPS.items()
+]
+_KNOWN_APP_LABELS = [info["label"] for info in KNOWN_APPS.values()]
+_LABEL_TO_EXE = {info["label"]: ex for ex, info in KNOWN_APPS.items()}
+
+
+def _report_write_error(future):
+    err = future.exception()
+    if err is not None:
+        print(f"[Backend] Failed to save config: {err}")
 
 
 class Backend(QObject):
@@ -23,26 +100,42 @@ class Backend(QObject):
 
     # ── Signals ────────────────────────────────────────────────
     mappingsChanged = Signal()
+    # profile, button key, action id, action label — one edited mapping
+    buttonMappingChanged = Signal(str, str, str, str)
     settingsChanged = Signal()
     profilesChanged = Signal()
     activeProfileChanged = Signal()
     statusMessage = Signal(str)
     dpiFromDevice = Signal(int)
 
-    # Internal cross-thread signals
-    _profileSwitchRequest = Signal(str)
-    _dpiReadRequest = Signal(int)
+    # Internal deferred-reload signal
+    _engineReloadRequest = Signal()
 
     def __init__(self, engine=None, parent=None):
         super().__init__(parent)
         self._engine = engine
         self._cfg = load_config()
-
-        # Cross-thread signal connections
-        self._profileSwitchRequest.connect(
-            self._handleProfileSwitch, Qt.QueuedConnection)
-        self._dpiReadRequest.connect(
-            self._handleDpiRead, Qt.QueuedConnection)
+        # The config helpers mutate self._cfg in place, so this stays valid
+        self._settings = self._cfg.setdefault("settings", {})
+        # Property results cached until the next mutation; QML re-reads
+        # bound properties far more often than they change.
+        self._buttonsCache = None
+        self._activeMappingsCache = None
+        self._profilesCache = None
+
+        # Slider-driven settings are written once the value settles
+        self._saveTimer = QTimer(self)
+        self._saveTimer.setSingleShot(True)
+        self._saveTimer.setInterval(250)
+        self._saveTimer.timeout.connect(self._saveNow)
+        # Config writes run in order on one worker thread, off the UI thread
+        self._ioPool = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="ConfigWriter")
+        self._writeGen = 0
+
+        self._engineReloadRequest.connect(
+            self._handleEngineReload, Qt.QueuedConnection)
+        self._reloadPending = False
 
         # Wire engine callbacks
         if engine:
@@ -54,66 +147,44 @@ class Backend(QObject):
     @Property(list, notify=mappingsChanged)
     def buttons(self):
         """List of button dicts for the active profile."""
-        mappings = get_active_mappings(self._cfg)
+        if self._buttonsCache is not None:
+            return self._buttonsCache
+        mget = self._activeMappings().get
         result = []
-        for i, (key, name) in enumerate(BUTTON_NAMES.items()):
-            aid = mappings.get(key, "none")
-            result.append({
+        append = result.append
+        for i, (key, name) in enumerate(BUTTON_NAMES.items(), 1):
+            aid = mget(key, "none")
+            append({
                 "key": key,
                 "name": name,
                 "actionId": aid,
                 "actionLabel": _action_label(aid),
-                "index": i + 1,
+                "index": i,
             })
+        self._buttonsCache = result
         return result
 
     @Property(list, constant=True)
     def actionCategories(self):
         """Actions grouped by category — for the action picker chips."""
-        from collections import OrderedDict
-        cats = OrderedDict()
-        for aid in sorted(
-            ACTIONS,
-            key=lambda a: (
-                "0" if ACTIONS[a]["category"] == "Other" else "1" + ACTIONS[a]["category"],
-                ACTIONS[a]["label"],
-            ),
-        ):
-            data = ACTIONS[aid]
-            cat = data["category"]
-            cats.setdefault(cat, []).append({"id": aid, "label": data["label"]})
-        return [{"category": c, "actions": a} for c, a in cats.items()]
+        return _ACTION_CATEGORIES
 
     @Property(list, constant=True)
     def allActions(self):
         """Flat sorted action list (Do Nothing first) — for ComboBoxes."""
-        result = []
-        none_data = ACTIONS.get("none")
-        if none_data:
-            result.append({"id": "none", "label": none_data["label"],
-                           "category": "Other"})
-        for aid in sorted(
-            ACTIONS,
-            key=lambda a: (ACTIONS[a]["category"], ACTIONS[a]["label"]),
-        ):
-            if aid == "none":
-                continue
-            data = ACTIONS[aid]
-            result.append({"id": aid, "label": data["label"],
-                           "category": data["category"]})
-        return result
+        return _ALL_ACTIONS
 
     @Property(int, notify=settingsChanged)
     def dpi(self):
-        return self._cfg.get("settings", {}).get("dpi", 1000)
+        return self._settings.get("dpi", 1000)
 
     @Property(bool, notify=settingsChanged)
     def invertVScroll(self):
-        return self._cfg.get("settings", {}).get("invert_vscroll", False)
+        return self._settings.get("invert_vscroll", False)
 
     @Property(bool, notify=settingsChanged)
     def invertHScroll(self):
-        return self._cfg.get("settings", {}).get("invert_hscroll", False)
+        return self._settings.get("invert_hscroll", False)
 
     @Property(str, notify=activeProfileChanged)
     def activeProfile(self):
@@ -121,91 +192,145 @@ class Backend(QObject):
 
     @Property(list, notify=profilesChanged)
     def profiles(self):
+        if self._profilesCache is not None:
+            return self._profilesCache
         result = []
+        append = result.append
         active = self._cfg.get("active_profile", "default")
         for pname, pdata in self._cfg.get("profiles", {}).items():
             # Collect icons for all apps in this profile
             apps = pdata.get("apps", [])
             app_icons = [get_icon_for_exe(ex) for ex in apps]
-            result.append({
+            append({
                 "name": pname,
                 "label": pdata.get("label", pname),
                 "apps": apps,
                 "appIcons": app_icons,
                 "isActive": pname == active,
             })
+        self._profilesCache = result
         return result
 
     @Property(list, constant=True)
     def knownApps(self):
-        return [{"exe": ex, "label": info["label"], "icon": get_icon_for_exe(ex)}
-                for ex, info in KNOWN_APPS.items()]
+        return _KNOWN_APPS_LIST
+
+    @Property(list, constant=True)
+    def knownAppLabels(self):
+        """Known-app labels in KNOWN_APPS order — for the add-profile picker."""
+        return _KNOWN_APP_LABELS
+
+    def _activeMappings(self):
+        """Active profile's mappings dict, cached until the next mutation."""
+        if self._activeMappingsCache is None:
+            self._activeMappingsCache = get_active_mappings(self._cfg)
+        return self._activeMappingsCache
 
     # ── Slots ──────────────────────────────────────────────────
 
     @Slot(str, str)
     def setMapping(self, button, actionId):
         """Set a button mapping in the active profile."""
-        self._cfg = set_mapping(self._cfg, button, actionId)
-        if self._engine:
-            self._engine.reload_mappings()
-        self.mappingsChanged.emit()
-        self.statusMessage.emit("Saved")
+        if self._activeMappings().get(button) == actionId:
+            return
+        self.setProfileMapping(
+            self._cfg.get("active_profile", "default"), button, actionId)
 
     @Slot(str, str, str)
     def setProfileMapping(self, profileName, button, actionId):
         """Set a button mapping in a specific profile."""
+        pdata = self._cfg.get("profiles", {}).get(profileName)
+        if pdata and pdata.get("mappings", {}).get(button) == actionId:
+            return
         self._cfg = set_mapping(self._cfg, button, actionId,
-                                profile=profileName)
-        if self._engine:
-            self._engine.reload_mappings()
-        self.profilesChanged.emit()
-        self.mappingsChanged.emit()
+                                profile=profileName, save=False)
+        self._writeConfig()
+        self._requestReload()
         self.statusMessage.emit("Saved")
+        self.buttonMappingChanged.emit(
+            profileName, button, actionId, _action_label(actionId))
+        if not pdata:
+            # set_mapping() created the profile
+            self._profilesCache = None
+            self.profilesChanged.emit()
+        if profileName == self._cfg.get("active_profile", "default"):
+            self._buttonsCache = None
+            self._activeMappingsCache = None
+            self.mappingsChanged.emit()
+
+    def _writeConfig(self):
+        """Queue a snapshot of the config for the writer thread."""
+        self._writeGen += 1
+        future = self._ioPool.submit(
+            self._writeSnapshot, self._writeGen, copy.deepcopy(self._cfg))
+        future.add_done_callback(_report_write_error)
+
+    def _writeSnapshot(self, gen, snapshot):
+        """Runs on the writer thread; only the newest snapshot is written."""
+        if gen != self._writeGen:
+            return
+        save_config(snapshot)
+
+    def _saveNow(self):
+        self._writeConfig()
+
+    @Slot()
+    def flushPendingSave(self):
+        """Queue a debounced settings change for writing right away."""
+        if self._saveTimer.isActive():
+            self._saveTimer.stop()
+            self._saveNow()
+
+    @Slot()
+    def shutdown(self):
+        """Flush pending config writes and stop the writer thread."""
+        self.flushPendingSave()
+        self._ioPool.shutdown(wait=True)
 
     @Slot(int)
     def setDpi(self, value):
-        self._cfg.setdefault("settings", {})["dpi"] = value
-        save_config(self._cfg)
+        if self._settings.get("dpi") == value:
+            return
+        self._settings["dpi"] = value
+        self._saveTimer.start()
         if self._engine:
-            self._engine.set_dpi(value)
+            # Persisted by the debounced writer, not per value by the engine
+            self._engine.set_dpi(value, save=False)
         self.settingsChanged.emit()
 
     @Slot(bool)
     def setInvertVScroll(self, value):
-        self._cfg.setdefault("settings", {})["invert_vscroll"] = value
-        save_config(self._cfg)
-        if self._engine:
-            self._engine.reload_mappings()
+        if self._settings.get("invert_vscroll") == value:
+            return
+        self._settings["invert_vscroll"] = value
+        self._saveTimer.start()
+        self._requestReload()
         self.settingsChanged.emit()
 
     @Slot(bool)
     def setInvertHScroll(self, value):
-        self._cfg.setdefault("settings", {})["invert_hscroll"] = value
-        save_config(self._cfg)
-        if self._engine:
-            self._engine.reload_mappings()
+        if self._settings.get("invert_hscroll") == value:
+            return
+        self._settings["invert_hscroll"] = value
+        self._saveTimer.start()
+        self._requestReload()
         self.settingsChanged.emit()
 
     @Slot(str)
     def addProfile(self, appLabel):
         """Create a new per-app profile from the known-apps label."""
-        exe = None
-        for ex, info in KNOWN_APPS.items():
-            if info["label"] == appLabel:
-                exe = ex
-                break
+        exe = _LABEL_TO_EXE.get(appLabel)
         if not exe:
             return
-        for pdata in self._cfg.get("profiles", {}).values():
-            if exe.lower() in [a.lower() for a in pdata.get("apps", [])]:
-                self.statusMessage.emit("Profile already exists")
-                return
+        if find_profile_for_app(self._cfg, exe) is not None:
+            self.statusMessage.emit("Profile already exists")
+            return
         safe_name = exe.replace(".exe", "").lower()
         self._cfg = create_profile(
-            self._cfg, safe_name, label=appLabel, apps=[exe])
-        if self._engine:
-            self._engine.cfg = self._cfg
+            self._cfg, safe_name, label=appLabel, apps=[exe], save=False)
+        self._writeConfig()
+        self._requestReload()
+        self._profilesCache = None
         self.profilesChanged.emit()
         self.statusMessage.emit("Profile created")
 
@@ -213,11 +338,15 @@ class Backend(QObject):
     def deleteProfile(self, name):
         if name == "default":
             return
-        self._cfg = delete_profile(self._cfg, name)
-        if self._engine:
-            self._engine.cfg = self._cfg
-            self._engine.reload_mappings()
+        self._cfg = delete_profile(self._cfg, name, save=False)
+        self._writeConfig()
+        self._requestReload()
+        # Deleting the active profile falls back to "default"
+        self._buttonsCache = None
+        self._activeMappingsCache = None
+        self._profilesCache = None
         self.profilesChanged.emit()
+        self.mappingsChanged.emit()
         self.statusMessage.emit("Profile deleted")
 
     @Slot(str, result=list)
@@ -225,11 +354,12 @@ class Backend(QObject):
         """Return button mappings for a specific profile."""
         profiles = self._cfg.get("profiles", {})
         pdata = profiles.get(profileName, {})
-        mappings = pdata.get("mappings", {})
+        mget = pdata.get("mappings", {}).get
         result = []
+        append = result.append
         for key, name in BUTTON_NAMES.items():
-            aid = mappings.get(key, "none")
-            result.append({
+            aid = mget(key, "none")
+            append({
                 "key": key,
                 "name": name,
                 "actionId": aid,
@@ -241,20 +371,41 @@ class Backend(QObject):
     def actionLabelFor(self, actionId):
         return _action_label(actionId)
 
+    # ── Engine reload ──────────────────────────────────────────
+
+    def _requestReload(self):
+        """Reload engine mappings on the next event-loop pass, once per burst."""
+        if not self._engine or self._reloadPending:
+            return
+        self._reloadPending = True
+        self._engineReloadRequest.emit()
+
+    @Slot()
+    def _handleEngineReload(self):
+        self._reloadPending = False
+        # Hand over a private copy: the engine changes active_profile on
+        # its own thread when it auto-switches
+        self._engine.reload_mappings(copy.deepcopy(self._cfg))
+
     # ── Engine thread callbacks (cross-thread safe) ────────────
 
     def _onEngineProfileSwitch(self, profile_name):
         """Called from engine thread — posts to Qt main thread."""
-        self._profileSwitchRequest.emit(profile_name)
+        QMetaObject.invokeMethod(self, "_handleProfileSwitch",
+                                 Qt.QueuedConnection, Q_ARG(str, profile_name))
 
     def _onEngineDpiRead(self, dpi):
         """Called from engine thread — posts to Qt main thread."""
-        self._dpiReadRequest.emit(dpi)
+        QMetaObject.invokeMethod(self, "_handleDpiRead",
+                                 Qt.QueuedConnection, Q_ARG(int, dpi))
 
     @Slot(str)
     def _handleProfileSwitch(self, profile_name):
         """Runs on Qt main thread."""
         self._cfg["active_profile"] = profile_name
+        self._buttonsCache = None
+        self._activeMappingsCache = None
+        self._profilesCache = None
         self.activeProfileChanged.emit()
         self.mappingsChanged.emit()
         self.profilesChanged.emit()
@@ -263,6 +414,6 @@ class Backend(QObject):
     @Slot(int)
     def _handleDpiRead(self, dpi):
         """Runs on Qt main thread."""
-        self._cfg.setdefault("settings", {})["dpi"] = dpi
+        self._settings["dpi"] = dpi
         self.settingsChanged.emit()
         self.dpiFromDevice.emit(dpi)
@@ -1,4 +1,5 @@
 import QtQuick
+import QtQuick.Shapes
 import "Theme.js" as Theme
 
 /*  A single clickable hotspot dot placed over the mouse image.
@@ -31,6 +32,14 @@ Item {
     property bool isSelected: mousePage.selectedButton === buttonKey
     property bool isHovered: dotMa.containsMouse
 
+    // Shared click handler for the dot and its label
+    function activate() {
+        if (isHScroll)
+            mousePage.selectHScroll()
+        else
+            mousePage.selectButton(buttonKey)
+    }
+
     // ── Glow ring ─────────────────────────────────────────────
     Rectangle {
         id: glow
@@ -77,39 +86,24 @@ Item {
         width: 36; height: 36
         hoverEnabled: true
         cursorShape: Qt.PointingHandCursor
-        onClicked: {
-            if (isHScroll)
-                mousePage.selectHScroll()
-            else
-                mousePage.selectButton(buttonKey)
-        }
+        onClicked: hotspot.activate()
     }
 
     // ── Connecting line ───────────────────────────────────────
-    Canvas {
-        id: lineCanvas
+    Shape {
         anchors.fill: parent
         z: -1
-        onPaint: {
-            var ctx = getContext("2d")
-            ctx.clearRect(0, 0, width, height)
-            ctx.strokeStyle = isSelected ? Theme.accent : Qt.rgba(0, 0.83, 0.67, 0.35)
-            ctx.lineWidth = 1
-            ctx.setLineDash([4, 3])
-            ctx.beginPath()
-            ctx.moveTo(cx, cy)
-            ctx.lineTo(cx + labelOffX, cy + labelOffY)
-            ctx.stroke()
+        preferredRendererType: Shape.CurveRenderer
+
+        ShapePath {
+            strokeColor: isSelected ? Theme.accent : Qt.rgba(0, 0.83, 0.67, 0.35)
+            strokeWidth: 1
+            strokeStyle: ShapePath.DashLine
+            dashPattern: [4, 3]
+            fillColor: "transparent"
+            startX: cx; startY: cy
+            PathLine { x: cx + labelOffX; y: cy + labelOffY }
         }
-
-        // Repaint when position or selection changes
-        Connections {
-            target: hotspot
-            function onCxChanged() { lineCanvas.requestPaint() }
-            function onCyChanged() { lineCanvas.requestPaint() }
-            function onIsSelectedChanged() { lineCanvas.requestPaint() }
-        }
-        Component.onCompleted: requestPaint()
     }
 
     // ── Annotation label ──────────────────────────────────────
@@ -154,12 +148,7 @@ Item {
         MouseArea {
             anchors.fill: parent
             cursorShape: Qt.PointingHandCursor
-            onClicked: {
-                if (isHScroll)
-                    mousePage.selectHScroll()
-                else
-                    mousePage.selectButton(buttonKey)
-            }
+            onClicked: hotspot.activate()
         }
     }
 
@@ -117,7 +117,16 @@ ApplicationWindow {
             currentIndex: currentPage
 
             MousePage {}
-            ScrollPage {}
+
+            // Built the first time the page is shown, then kept
+            Loader {
+                active: false
+                sourceComponent: Component { ScrollPage {} }
+                StackLayout.onIsCurrentItemChanged: {
+                    if (StackLayout.isCurrentItem)
+                        active = true
+                }
+            }
         }
     }
 
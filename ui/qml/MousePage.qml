@@ -16,11 +16,23 @@ Item {
     property string selectedProfile: backend.activeProfile
     property string selectedProfileLabel: ""
     property var    selectedProfileApps: []
+    // button key -> row from getProfileMappings() for selectedProfile;
+    // reassigned (never mutated) so bindings that read it re-evaluate
+    property var    profileMappings: ({})
 
     Component.onCompleted: selectProfile(backend.activeProfile)
 
+    function loadProfileMappings() {
+        var btns = backend.getProfileMappings(selectedProfile)
+        var m = {}
+        for (var i = 0; i < btns.length; i++)
+            m[btns[i].key] = btns[i]
+        profileMappings = m
+    }
+
     function selectProfile(name) {
         selectedProfile = name
+        loadProfileMappings()
         var profs = backend.profiles
         for (var i = 0; i < profs.length; i++) {
             if (profs[i].name === name) {
@@ -68,14 +80,11 @@ Item {
             selectedActionId = ""
             return
         }
-        var btns = backend.getProfileMappings(selectedProfile)
-        for (var i = 0; i < btns.length; i++) {
-            if (btns[i].key === key) {
-                selectedButton = key
-                selectedButtonName = btns[i].name
-                selectedActionId = btns[i].actionId
-                return
-            }
+        var row = profileMappings[key]
+        if (row) {
+            selectedButton = key
+            selectedButtonName = row.name
+            selectedActionId = row.actionId
         }
     }
 
@@ -88,42 +97,33 @@ Item {
         }
         selectedButton = "hscroll_left"
         selectedButtonName = "Horizontal Scroll"
-        var btns = backend.getProfileMappings(selectedProfile)
-        for (var i = 0; i < btns.length; i++) {
-            if (btns[i].key === "hscroll_left") {
-                selectedActionId = btns[i].actionId
-                break
-            }
-        }
+        var row = profileMappings["hscroll_left"]
+        if (row)
+            selectedActionId = row.actionId
     }
 
     Connections {
         id: mappingsConn
         target: backend
-        function onMappingsChanged() {
-            if (selectedButton === "") return
-            var btns = backend.getProfileMappings(selectedProfile)
-            for (var i = 0; i < btns.length; i++) {
-                if (btns[i].key === selectedButton) {
-                    selectedActionId = btns[i].actionId
-                    break
-                }
-            }
+        function onButtonMappingChanged(profile, button, actionId, actionLabel) {
+            if (profile !== selectedProfile) return
+            var m = Object.assign({}, profileMappings)
+            m[button] = Object.assign({}, m[button],
+                                      { actionId: actionId, actionLabel: actionLabel })
+            profileMappings = m
+            if (button === selectedButton)
+                selectedActionId = actionId
         }
     }
 
     function actionFor(key) {
-        var btns = backend.getProfileMappings(selectedProfile)
-        for (var i = 0; i < btns.length; i++)
-            if (btns[i].key === key) return btns[i].actionLabel
-        return "Do Nothing"
+        var row = profileMappings[key]
+        return row ? row.actionLabel : "Do Nothing"
     }
 
     function actionFor_id(key) {
-        var btns = backend.getProfileMappings(selectedProfile)
-        for (var i = 0; i < btns.length; i++)
-            if (btns[i].key === key) return btns[i].actionId
-        return "none"
+        var row = profileMappings[key]
+        return row ? row.actionId : "none"
     }
 
     // ── Main two-column layout ────────────────────────────────
@@ -272,13 +272,7 @@ Item {
                         ComboBox {
                             id: addCombo
                             Layout.fillWidth: true
-                            model: {
-                                var apps = backend.knownApps
-                                var labels = []
-                                for (var i = 0; i < apps.length; i++)
-                                    labels.push(apps[i].label)
-                                return labels
-                            }
+                            model: backend.knownAppLabels
                             Material.accent: Theme.accent
                             font { family: Theme.fontFamily; pixelSize: 10 }
                         }